@@ -0,0 +1,49 @@
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Register
+
+# Keeps each UPDATE's `IN (...)` list under SQLite's parameter limit
+BATCH_SIZE = 500
+
+
+def update_attendance(event, entries):
+    """
+    Applies validated `[{'mentor': username, 'attended': bool}, ...]` rows to
+    the registrations of `event`.
+
+    Returns a list of per-row errors aligned with `entries` (empty dicts for
+    good rows) if any row names a mentor that is not registered for the
+    event or appears twice; nothing is written in that case. Otherwise all
+    changes are written in one transaction and None is returned.
+    """
+    usernames = [entry['mentor'] for entry in entries]
+    # One joined query for the whole roster: username -> registration id
+    registrations = dict(
+        Register.objects.filter(event=event).values_list('mentor__username', 'pk'))
+
+    errors = []
+    seen = set()
+    for username in usernames:
+        if username not in registrations:
+            errors.append({'mentor': ['%s is not registered for this event.' % username]})
+        elif username in seen:
+            errors.append({'mentor': ['%s is listed more than once.' % username]})
+        else:
+            errors.append({})
+        seen.add(username)
+    if any(errors):
+        return errors
+
+    # Attendance is a flag, so every row is written by one of two UPDATEs
+    # (per batch) instead of one query per registration
+    by_value = {True: [], False: []}
+    for entry in entries:
+        by_value[entry['attended']].append(registrations[entry['mentor']])
+    now = timezone.now()
+    with transaction.atomic():
+        for attended, pks in by_value.items():
+            for start in range(0, len(pks), BATCH_SIZE):
+                Register.objects.filter(pk__in=pks[start:start + BATCH_SIZE]).exclude(
+                    attended=attended).update(attended=attended, updated_at=now)
+    return None
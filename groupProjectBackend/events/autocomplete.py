@@ -0,0 +1,245 @@
+"""
+Per-process autocomplete index over open event names, category names and
+organisation company names.
+
+Every word of a label is stored in a sorted vocabulary, so a prefix lookup
+is a bisect plus a short scan. Words are also indexed by their character
+trigrams (anchored at the start of the word), which gives the candidates for
+typo-tolerant matching; candidates are then checked with a bounded prefix
+edit distance. The index is kept up to date by the signals in
+events/signals.py and reloaded in the background like the spatial index.
+
+While the index is cold complete() returns None and callers fall back to
+plain prefix queries.
+"""
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+from .memindex import InMemoryIndex
+
+EVENT = 'event'
+CATEGORY = 'category'
+ORGANISATION = 'organisation'
+# Tie-break between equally good matches: broad results first
+KIND_ORDER = {CATEGORY: 0, ORGANISATION: 1, EVENT: 2}
+# Maximum number of vocabulary words a single query token may expand to
+MAX_EXPANSIONS = 50
+
+
+def normalise(text):
+    """
+    Lower-cases `text`, strips accents and splits it into words.
+    """
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return re.findall(r'\w+', text.lower())
+
+
+def trigrams(word):
+    word = '$' + word
+    return {word[i:i + 3] for i in range(len(word) - 2)}
+
+
+def allowed_typos(token):
+    if len(token) < 4:
+        return 0
+    if len(token) < 8:
+        return 1
+    return 2
+
+
+def prefix_distance(token, word, bound):
+    """
+    Returns the smallest edit distance (counting a swap of two adjacent
+    characters as one edit) between `token` and any prefix of `word`, or
+    bound + 1 if it is larger than `bound`.
+    """
+    word = word[:len(token) + bound]
+    before, previous = None, list(range(len(word) + 1))
+    for i, char in enumerate(token, 1):
+        current = [i]
+        for j, other in enumerate(word, 1):
+            cost = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (char != other),
+            )
+            if (i > 1 and j > 1 and char == word[j - 2] and token[i - 2] == other):
+                cost = min(cost, before[j - 2] + 1)
+            current.append(cost)
+        if min(current) > bound and (before is None or min(previous) > bound):
+            return bound + 1
+        before, previous = previous, current
+    return min(previous)
+
+
+class AutocompleteIndex(InMemoryIndex):
+    """
+    Keys are (kind, pk) pairs; values are (label, identifier) pairs, where the
+    identifier is what the client uses to open the result (event id, category
+    name or organisation username).
+    """
+
+    def __init__(self, ttl=300):
+        super().__init__(ttl)
+        self.entries = {}
+        self.vocabulary = []
+        self.postings = defaultdict(set)
+        self.grams = defaultdict(set)
+
+    def fetch(self):
+        from users.models import OrgProfile
+        from .models import Category, Event
+
+        for pk, name in Event.objects.filter(is_open=True).values_list('pk', 'event_name'):
+            yield (EVENT, pk), (name, pk)
+        for pk, name in Category.objects.values_list('pk', 'category'):
+            yield (CATEGORY, pk), (name, name)
+        for pk, company_name, username in OrgProfile.objects.exclude(
+                company_name=None).exclude(user=None).values_list(
+                'user_id', 'company_name', 'user__username'):
+            yield (ORGANISATION, pk), (company_name, username)
+
+    def _insert(self, key, value):
+        words = set(normalise(value[0]))
+        if not words:
+            return
+        self.entries[key] = (value[0], value[1], words)
+        for word in words:
+            if word not in self.postings:
+                insort(self.vocabulary, word)
+                for gram in trigrams(word):
+                    self.grams[gram].add(word)
+            self.postings[word].add(key)
+
+    def _discard(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return
+        for word in entry[2]:
+            keys = self.postings[word]
+            keys.discard(key)
+            if keys:
+                continue
+            del self.postings[word]
+            del self.vocabulary[bisect_left(self.vocabulary, word)]
+            for gram in trigrams(word):
+                self.grams[gram].discard(word)
+                if not self.grams[gram]:
+                    del self.grams[gram]
+
+    def _get(self, key):
+        entry = self.entries.get(key)
+        return entry[:2] if entry is not None else None
+
+    def _clear(self):
+        self.entries = {}
+        self.vocabulary = []
+        self.postings = defaultdict(set)
+        self.grams = defaultdict(set)
+
+    def _match_token(self, token):
+        """
+        Returns {word: typos} for the vocabulary words that start with
+        `token`, allowing a few typos for longer tokens.
+        """
+        matches = {}
+        start = bisect_left(self.vocabulary, token)
+        for word in self.vocabulary[start:start + MAX_EXPANSIONS]:
+            if not word.startswith(token):
+                break
+            matches[word] = 0
+
+        bound = allowed_typos(token)
+        if not bound:
+            return matches
+        token_grams = trigrams(token)
+        # Each typo breaks at most four of the token's trigrams (a swap of
+        # two characters touches four)
+        threshold = max(len(token_grams) - 4 * bound, 1)
+        shared = Counter()
+        for gram in token_grams:
+            shared.update(self.grams.get(gram, ()))
+        candidates = [word for word, count in shared.items()
+                      if count >= threshold and word not in matches]
+        for word in candidates:
+            distance = prefix_distance(token, word, bound)
+            if distance <= bound:
+                matches[word] = distance
+        return matches
+
+    def complete(self, query, limit=10):
+        """
+        Returns up to `limit` suggestions as dicts with `type`, `id` and
+        `label`, best first, or None if the index is cold. Every word of the
+        query must match (as a prefix, possibly with typos) a word of the
+        label.
+        """
+        tokens = normalise(query)
+        if not tokens:
+            return []
+        if not self.ensure_fresh():
+            return None
+        with self.lock:
+            scores = None
+            for token in dict.fromkeys(tokens):
+                token_scores = {}
+                for word, typos in self._match_token(token).items():
+                    for key in self.postings[word]:
+                        if typos < token_scores.get(key, typos + 1):
+                            token_scores[key] = typos
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {key: typos + token_scores[key]
+                              for key, typos in scores.items() if key in token_scores}
+                if not scores:
+                    return []
+            entries = {key: self.entries[key][:2] for key in scores}
+
+        ranked = heapq.nsmallest(limit, scores, key=lambda key: (
+            scores[key], KIND_ORDER[key[0]], len(entries[key][0]),
+            entries[key][0].lower(), key[1]))
+        return [
+            {'type': key[0], 'id': entries[key][1], 'label': entries[key][0]}
+            for key in ranked
+        ]
+
+
+def fallback_complete(query, limit=10):
+    """
+    Plain prefix match on the whole label, used while the index is cold.
+    """
+    from users.models import OrgProfile
+    from .models import Category, Event
+
+    query = query.strip()
+    if not query:
+        return []
+    results = [
+        {'type': CATEGORY, 'id': name, 'label': name}
+        for name in Category.objects.filter(
+            category__istartswith=query).order_by('category').values_list(
+            'category', flat=True)[:limit]
+    ]
+    results += [
+        {'type': ORGANISATION, 'id': username, 'label': company_name}
+        for company_name, username in OrgProfile.objects.filter(
+            company_name__istartswith=query).exclude(user=None).order_by(
+            'company_name').values_list('company_name', 'user__username')[:limit]
+    ]
+    results += [
+        {'type': EVENT, 'id': pk, 'label': name}
+        for pk, name in Event.objects.filter(
+            is_open=True, event_name__istartswith=query).order_by(
+            'event_name', 'pk').values_list('pk', 'event_name')[:limit]
+    ]
+    return results[:limit]
+
+
+suggestions = AutocompleteIndex(ttl=getattr(settings, 'AUTOCOMPLETE_INDEX_TTL', 300))
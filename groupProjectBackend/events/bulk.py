@@ -0,0 +1,55 @@
+"""
+Bulk event creation.
+
+A whole list of validated events is written in one transaction with a
+single `bulk_create` for the events and one for their category links.
+`bulk_create` sends no model signals, so `events_created` is sent instead
+and events/signals.py updates the indexes and caches for the new events.
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+from .models import Event
+
+# Sent (with sender=Event) after events are created in bulk, with the list
+# of new `events`
+events_created = Signal()
+
+
+def _assign_pks(events):
+    """
+    Sets the primary keys of freshly bulk inserted events on backends that
+    cannot return them from the INSERT (SQLite). The transaction holds
+    SQLite's write lock, so the newest rows are the ones just inserted, in
+    insertion order.
+    """
+    pks = list(Event.objects.order_by('-pk').values_list('pk', flat=True)[:len(events)])
+    for event, pk in zip(events, reversed(pks)):
+        event.pk = pk
+
+
+def create_events(rows):
+    """
+    Creates one event per validated `EventSerializer` row (including the
+    `organiser`) and returns them, with primary keys, in input order.
+    """
+    Categories = Event.categories.through
+    events = []
+    links = []
+    for row in rows:
+        row = dict(row)
+        categories = row.pop('categories', [])
+        events.append(Event(**row))
+        links.append({category.pk for category in categories})
+
+    with transaction.atomic():
+        Event.objects.bulk_create(events)
+        if events and events[0].pk is None:
+            _assign_pks(events)
+        Categories.objects.bulk_create([
+            Categories(event_id=event.pk, category_id=category_id)
+            for event, category_ids in zip(events, links)
+            for category_id in sorted(category_ids)
+        ])
+        events_created.send(sender=Event, events=events)
+    return events
@@ -0,0 +1,110 @@
+"""
+Per-process catalog of categories.
+
+The category table is small and rarely written, so every process keeps all
+of it in memory (slug <-> id) and resolves category slugs without a query.
+It is loaded on first use, kept up to date by the Category signals in
+events/signals.py, and reloaded in the background once older than its ttl
+to pick up writes made by other processes.
+
+Lookups that miss go to the database, so categories created in the current
+(uncommitted) transaction are still found. Writes re-check the categories
+they got from the catalog (see recheck()): another process's catalog can
+be out of date by up to its ttl.
+"""
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .memindex import InMemoryIndex
+
+
+class CategoryCatalog(InMemoryIndex):
+
+    def __init__(self, ttl=300):
+        super().__init__(ttl)
+        self.slugs = {}
+        self.ids = {}
+
+    def fetch(self):
+        from .models import Category
+
+        return Category.objects.values_list('id', 'category')
+
+    def _insert(self, pk, slug):
+        self.slugs[pk] = slug
+        self.ids[slug] = pk
+
+    def _discard(self, pk):
+        slug = self.slugs.pop(pk, None)
+        if slug is not None and self.ids.get(slug) == pk:
+            del self.ids[slug]
+
+    def _get(self, pk):
+        return self.slugs.get(pk)
+
+    def _clear(self):
+        self.slugs = {}
+        self.ids = {}
+
+    def _warm(self):
+        # The table is small: a cold catalog is loaded right away instead of
+        # falling back to queries until a background load finishes
+        if not self.ready:
+            self.load()
+        else:
+            self.ensure_fresh()
+
+    @staticmethod
+    def _category(pk, slug):
+        from .models import Category
+
+        # Fresh instances per call: callers may modify what they get
+        return Category.from_db(DEFAULT_DB_ALIAS, ['id', 'category'], [pk, slug])
+
+    def by_slug(self, slug):
+        """
+        Returns the Category called `slug`, or None if there is none.
+        """
+        from .models import Category
+
+        self._warm()
+        with self.lock:
+            pk = self.ids.get(slug)
+        if pk is not None:
+            return self._category(pk, slug)
+        return Category.objects.filter(category=slug).first()
+
+    def recheck(self, found):
+        """
+        Checks Categories returned by by_slug() against the database, in two
+        queries at most. Returns {slug: current Category or None} for the
+        ones deleted or renamed since the catalog loaded them, which are
+        dropped from the catalog.
+        """
+        from .models import Category
+
+        found = {category.pk: category.category for category in found}
+        current = dict(Category.objects.filter(pk__in=found).values_list('id', 'category'))
+        stale = {pk: slug for pk, slug in found.items() if current.get(pk) != slug}
+        if not stale:
+            return {}
+        for pk in stale:
+            self.remove(pk)
+        # The slug may have moved to another category
+        moved = {
+            category.category: category
+            for category in Category.objects.filter(category__in=stale.values())
+        }
+        return {slug: moved.get(slug) for slug in stale.values()}
+
+    def all(self):
+        """
+        Returns every category, oldest first.
+        """
+        self._warm()
+        with self.lock:
+            rows = sorted(self.slugs.items())
+        return [self._category(pk, slug) for pk, slug in rows]
+
+
+categories = CategoryCatalog(ttl=getattr(settings, 'CATEGORY_CATALOG_TTL', 300))
@@ -0,0 +1,226 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .fieldsets import SparseFieldsetMixin, requested_fields
+
+_compiled = {}
+
+# Field classes whose representation of an already-correctly-typed value is
+# the value itself
+_PASSTHROUGH_TYPES = [
+    (serializers.BooleanField, bool),
+    (serializers.IntegerField, int),
+    (serializers.CharField, str),
+]
+
+
+def _datetime_formatter(field):
+    """
+    Returns a fast formatter equivalent to DateTimeField.to_representation
+    for the default ISO 8601 output, or None if the field is customised.
+    """
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if (output_format is None or output_format.lower() != 'iso-8601'
+            or not settings.USE_TZ or hasattr(field, 'timezone')):
+        return None
+
+    def format_datetime(value, tz):
+        if not timezone.is_aware(value):
+            return field.to_representation(value)
+        value = value.astimezone(tz).isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+        return value
+    return format_datetime
+
+
+def _decimal_formatter(field):
+    """
+    Database decimals already come back quantized to the column's scale, so
+    they only need formatting; anything else takes DRF's quantize path.
+    """
+    coerce_to_string = getattr(
+        field, 'coerce_to_string', api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce_to_string or field.localize or field.decimal_places is None:
+        return None
+    exponent = -field.decimal_places
+
+    def format_decimal(value, tz):
+        if value.__class__ is Decimal and value.as_tuple().exponent == exponent:
+            return '{:f}'.format(value)
+        return field.to_representation(value)
+    return format_decimal
+
+
+class CompiledSerializer:
+    """
+    Read-only fast path for a plain `Serializer` class.
+
+    The field list is compiled once into a specialised Python function that
+    builds the representation straight from `.values()` rows, skipping the
+    per-field `get_attribute`/`to_representation` dispatch. The output is
+    identical to `serializer_class(instances, many=True).data`.
+
+    Supported fields are scalar fields (including dotted to-one sources such
+    as `organiser.username`) and many=True slug/primary key relations backed
+    by a forward ManyToManyField, which are loaded with one extra query.
+    `fields` restricts the output (and the columns read) to those fields.
+    """
+
+    def __init__(self, serializer_class, model, fields=None):
+        self.serializer_class = serializer_class
+        self.model = model
+        self.fields = fields
+        self.pk_name = model._meta.pk.attname
+        self.lookups = [self.pk_name]
+        self.related = []
+        self.to_representation = self.compile()
+
+    def compile(self):
+        namespace = {}
+        lines = ['def to_representation(row, related, tz):']
+        keys = []
+        for index, (name, field) in enumerate(self.serializer_class().fields.items()):
+            if field.write_only or (self.fields is not None and name not in self.fields):
+                continue
+            var = 'v%d' % index
+            keys.append((name, var))
+
+            if isinstance(field, serializers.ManyRelatedField):
+                lines.append('    %s = related[%d].get(row[%r], [])' % (
+                    var, len(self.related), self.pk_name))
+                self.related.append(self.many_related_lookup(name, field))
+                continue
+
+            lookup = self.value_lookup(name, field)
+            if lookup not in self.lookups:
+                self.lookups.append(lookup)
+            lines.append('    %s = row[%r]' % (var, lookup))
+
+            if isinstance(field, (serializers.ReadOnlyField, serializers.RelatedField)):
+                continue
+            formatter = None
+            if isinstance(field, serializers.DateTimeField):
+                formatter = _datetime_formatter(field)
+            elif isinstance(field, serializers.DecimalField):
+                formatter = _decimal_formatter(field)
+            if formatter is not None:
+                namespace['format_%s' % var] = formatter
+                lines.append('    if %s is not None:' % var)
+                lines.append('        %s = format_%s(%s, tz)' % (var, var, var))
+                continue
+
+            namespace['field_%s' % var] = field
+            fast_type = next((python_type for field_class, python_type in _PASSTHROUGH_TYPES
+                              if isinstance(field, field_class)), None)
+            if fast_type is not None:
+                namespace['type_%s' % var] = fast_type
+                lines.append('    if %s is not None and %s.__class__ is not type_%s:' % (var, var, var))
+            else:
+                lines.append('    if %s is not None:' % var)
+            lines.append('        %s = field_%s.to_representation(%s)' % (var, var, var))
+
+        lines.append('    return {%s}' % ', '.join('%r: %s' % key for key in keys))
+        exec('\n'.join(lines), namespace)
+        return namespace['to_representation']
+
+    def value_lookup(self, name, field):
+        if isinstance(field, (serializers.BaseSerializer, serializers.FileField,
+                              serializers.SerializerMethodField, serializers.HiddenField,
+                              serializers.HyperlinkedRelatedField)):
+            raise ImproperlyConfigured(
+                "Field '%s' of %s cannot be compiled" % (name, self.serializer_class.__name__))
+        source_attrs = list(field.source_attrs)
+        if isinstance(field, serializers.SlugRelatedField):
+            source_attrs.append(field.slug_field)
+        return '__'.join(source_attrs)
+
+    def many_related_lookup(self, name, field):
+        model_field = self.model._meta.get_field(field.source)
+        child = field.child_relation
+        if not model_field.many_to_many or model_field.auto_created:
+            raise ImproperlyConfigured(
+                "Field '%s' of %s cannot be compiled" % (name, self.serializer_class.__name__))
+        through = model_field.remote_field.through
+        source = model_field.m2m_field_name()
+        target = model_field.m2m_reverse_field_name()
+        if isinstance(child, serializers.SlugRelatedField):
+            value = '%s__%s' % (target, child.slug_field)
+        elif isinstance(child, serializers.PrimaryKeyRelatedField):
+            value = '%s_id' % target
+        else:
+            raise ImproperlyConfigured(
+                "Field '%s' of %s cannot be compiled" % (name, self.serializer_class.__name__))
+        return through, source, target, value
+
+    def values(self, queryset, *extra):
+        """
+        Turns an instance queryset into the `.values()` rows this serializer
+        reads. `extra` names additional columns to keep (e.g. pagination keys).
+        """
+        lookups = self.lookups + [name for name in extra if name not in self.lookups]
+        return queryset.prefetch_related(None).values(*lookups)
+
+    def serialize(self, rows):
+        rows = list(rows)
+        pks = [row[self.pk_name] for row in rows]
+        related = []
+        for through, source, target, value in self.related:
+            grouped = defaultdict(list)
+            if pks:
+                pairs = through.objects.filter(**{'%s__in' % source: pks}).order_by(
+                    '%s_id' % target).values_list('%s_id' % source, value)
+                for pk, related_value in pairs:
+                    grouped[pk].append(related_value)
+            related.append(grouped)
+        tz = timezone.get_current_timezone()
+        to_representation = self.to_representation
+        return [to_representation(row, related, tz) for row in rows]
+
+
+def compile_serializer(serializer_class, model=None, fields=None):
+    """
+    Returns the (cached) CompiledSerializer for a serializer class, or for
+    the subset `fields` of its fields.
+    """
+    model = model or getattr(getattr(serializer_class, 'Meta', None), 'model', None)
+    if model is None:
+        raise ImproperlyConfigured(
+            'compile_serializer() needs a model for %s' % serializer_class.__name__)
+    key = (serializer_class, model, fields)
+    if key not in _compiled:
+        _compiled[key] = CompiledSerializer(serializer_class, model, fields)
+    return _compiled[key]
+
+
+class CompiledListMixin:
+    """
+    Opt-in mixin for generic list views: serializes pages with the compiled
+    fast path instead of instantiating `serializer_class`, honouring
+    `?fields=` for serializers with sparse fieldsets.
+    Views must define `compiled_model` unless the serializer is a ModelSerializer.
+    """
+    compiled_model = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        fields = None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            fields = requested_fields(serializer_class, request)
+        compiled = compile_serializer(serializer_class, self.compiled_model, fields)
+        ordering = getattr(self.paginator, 'ordering', ())
+        queryset = compiled.values(
+            self.filter_queryset(self.get_queryset()),
+            *[field.lstrip('-') for field in ordering]
+        )
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(compiled.serialize(page))
+        return Response(compiled.serialize(queryset))
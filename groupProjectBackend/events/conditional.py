@@ -0,0 +1,35 @@
+from calendar import timegm
+from functools import wraps
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+def conditional_get(method):
+    """
+    Decorates an APIView `get` so that If-None-Match / If-Modified-Since
+    requests are answered with 304 Not Modified before the view runs.
+
+    The view must define `get_version(request, *args, **kwargs)` returning
+    the `updated_at` of everything the response shows, using a cheap lookup,
+    or None if the object does not exist (the view then runs and 404s).
+    """
+    @wraps(method)
+    def get(view, request, *args, **kwargs):
+        updated_at = view.get_version(request, *args, **kwargs)
+        if updated_at is None:
+            return method(view, request, *args, **kwargs)
+
+        # The representation also depends on the negotiated renderer
+        etag = quote_etag('%d-%s' % (
+            int(updated_at.timestamp() * 1000000), request.accepted_renderer.format))
+        last_modified = timegm(updated_at.utctimetuple())
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = method(view, request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+    return get
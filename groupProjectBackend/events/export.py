@@ -0,0 +1,96 @@
+"""
+Streaming roster exports.
+
+Rows come from a single joined `.values_list()` query read with
+`.iterator()` (a server-side cursor on PostgreSQL), and are encoded and
+sent one chunk at a time, so memory use does not grow with the roster.
+"""
+import csv
+
+from django.http import StreamingHttpResponse
+from rest_framework.utils.encoders import JSONEncoder
+
+from .models import Register
+from .streaming import buffered
+
+CHUNK_SIZE = 2000
+
+# (column name, Register lookup)
+ROSTER_COLUMNS = [
+    ('event', 'event_id'),
+    ('event_name', 'event__event_name'),
+    ('registration', 'id'),
+    ('mentor', 'mentor__username'),
+    ('email', 'mentor__email'),
+    ('name', 'mentor__mentor_profile__name'),
+    ('location', 'mentor__mentor_profile__location'),
+    ('bio', 'mentor__mentor_profile__bio'),
+    ('date_registered', 'date_registered'),
+    ('attended', 'attended'),
+]
+
+
+def roster_rows(registrations):
+    """
+    Yields one tuple per registration, in ROSTER_COLUMNS order.
+    """
+    return registrations.order_by('event_id', 'id').values_list(
+        *[lookup for _, lookup in ROSTER_COLUMNS]
+    ).iterator(chunk_size=CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back what is written"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    # Same timestamp format as the JSON API
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+        if value.endswith('+00:00'):
+            value = value[:-6] + 'Z'
+    return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in ROSTER_COLUMNS])
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def stream_ndjson(rows):
+    names = [name for name, _ in ROSTER_COLUMNS]
+    encoder = JSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+STREAMS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'ndjson': (stream_ndjson, 'application/x-ndjson; charset=utf-8'),
+}
+
+
+def roster_response(registrations, export_format, filename):
+    """
+    Returns a StreamingHttpResponse exporting `registrations` (a Register
+    queryset) as 'csv' or 'ndjson'.
+    """
+    stream, content_type = STREAMS[export_format]
+    response = StreamingHttpResponse(
+        buffered(stream(roster_rows(registrations))), content_type=content_type)
+    response['Content-Disposition'] = 'attachment; filename="%s.%s"' % (
+        filename, export_format)
+    return response
+
+
+def event_roster(event):
+    return Register.objects.filter(event=event)
+
+
+def organiser_roster(organiser):
+    return Register.objects.filter(event__organiser=organiser)
@@ -0,0 +1,197 @@
+"""
+Personalised event feeds for mentors.
+
+An open event is in a mentor's feed if it shares a category with the
+mentor's skills. Its score is
+
+    log((1 + SKILL_WEIGHT * shared skills / skills) * proximity)
+        + DECAY_RATE * (date_created - EPOCH)
+
+where proximity falls off with the distance to the event. As with the
+trending score (events/trending.py) recency is a log-time term, so stored
+scores never need decaying and a feed stays in order as time passes.
+
+Feeds are stored as FeedEntry rows and read with one (mentor, score) index
+scan. events/signals.py collects the events and mentors changed by a
+transaction and, once it commits, queues one refresh for them on a
+background worker, off the request path (see refresh_later()). A changed event is rescored
+against the mentors having one of its categories, and a changed profile
+against the events in one of its skills: candidates come from the
+skill/category through tables (the sparse skill x event overlap), so the
+work is proportional to the number of matching pairs, never to all
+mentors x all events.
+"""
+import logging
+import math
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+from users.models import MentorProfile
+from .geo import great_circle_distance
+from .models import Event, FeedEntry
+from .trending import EPOCH
+
+logger = logging.getLogger(__name__)
+
+SKILL_WEIGHT = 4.0
+# Proximity halves at this distance
+DISTANCE_SCALE_KM = 10
+HALF_LIFE = timedelta(days=getattr(settings, 'FEED_HALF_LIFE_DAYS', 14))
+DECAY_RATE = math.log(2) / HALF_LIFE.total_seconds()
+
+EventCategories = Event.categories.through
+MentorSkills = MentorProfile.skills.through
+
+# Events (or mentors) refreshed per query batch
+BATCH_SIZE = 1000
+# One worker: refreshes run in the order their transactions committed
+pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='feeds')
+
+
+def score(shared, skills, distance, date_created):
+    """
+    Returns the feed score of an event for a mentor, or None if the event
+    does not belong in their feed.
+    """
+    if not shared:
+        return None
+    relevance = (1 + SKILL_WEIGHT * shared / skills) / (1 + distance / DISTANCE_SCALE_KM)
+    return math.log(relevance) + DECAY_RATE * (date_created - EPOCH).total_seconds()
+
+
+def _group(pairs):
+    grouped = defaultdict(set)
+    for key, value in pairs:
+        grouped[key].add(value)
+    return grouped
+
+
+def _replace(entries, **lookup):
+    """
+    Replaces the FeedEntry rows matching `lookup` with `entries`, (mentor
+    id, event id, score) tuples. Feeds can hold many rows: they are
+    inserted without instantiating models.
+    """
+    sql = 'INSERT INTO %s (%s, %s, %s) VALUES (%%s, %%s, %%s)' % (
+        connection.ops.quote_name(FeedEntry._meta.db_table),
+        *(connection.ops.quote_name(FeedEntry._meta.get_field(name).column)
+          for name in ('mentor', 'event', 'score')),
+    )
+    with transaction.atomic():
+        FeedEntry.objects.filter(**lookup).delete()
+        with connection.cursor() as cursor:
+            for start in range(0, len(entries), BATCH_SIZE):
+                cursor.executemany(sql, entries[start:start + BATCH_SIZE])
+
+
+def refresh_mentor(user_id):
+    """
+    Rebuilds the feed of one mentor.
+    """
+    profile = MentorProfile.objects.filter(user_id=user_id).values_list(
+        'pk', 'latitude', 'longitude').first()
+    if profile is None:
+        FeedEntry.objects.filter(mentor_id=user_id).delete()
+        return
+    profile_id, latitude, longitude = profile[0], float(profile[1]), float(profile[2])
+    skills = set(MentorSkills.objects.filter(
+        mentorprofile_id=profile_id).values_list('category_id', flat=True))
+    categories = _group(EventCategories.objects.filter(
+        category_id__in=skills, event__is_open=True).values_list('event_id', 'category_id'))
+
+    entries = []
+    for pk, event_latitude, event_longitude, date_created in Event.objects.filter(
+            pk__in=categories).values_list('pk', 'latitude', 'longitude', 'date_created'):
+        distance = great_circle_distance(
+            latitude, longitude, float(event_latitude), float(event_longitude))
+        value = score(len(categories[pk]), len(skills), distance, date_created)
+        if value is not None:
+            entries.append((user_id, pk, value))
+    _replace(entries, mentor_id=user_id)
+
+
+def refresh_mentors(user_ids):
+    for user_id in user_ids:
+        refresh_mentor(user_id)
+
+
+def refresh_events(event_ids):
+    """
+    Rescores the given events for every mentor having one of their
+    categories. Closed and deleted events are dropped from all feeds.
+    """
+    event_ids = list(event_ids)
+    events = list(Event.objects.filter(pk__in=event_ids, is_open=True).values_list(
+        'pk', 'latitude', 'longitude', 'date_created'))
+    categories = _group(EventCategories.objects.filter(
+        event_id__in=[row[0] for row in events]).values_list('event_id', 'category_id'))
+    mentors = _group(MentorSkills.objects.filter(
+        category_id__in=set().union(*categories.values()),
+        mentorprofile__user__isnull=False,
+    ).values_list('category_id', 'mentorprofile_id'))
+
+    profiles = {}
+    candidates = set().union(*mentors.values())
+    for pk, user_id, latitude, longitude in MentorProfile.objects.filter(
+            pk__in=candidates).values_list('pk', 'user_id', 'latitude', 'longitude'):
+        profiles[pk] = (user_id, float(latitude), float(longitude))
+    skills = defaultdict(int)
+    for profile_id in MentorSkills.objects.filter(
+            mentorprofile_id__in=candidates).values_list('mentorprofile_id', flat=True):
+        skills[profile_id] += 1
+
+    entries = []
+    for pk, latitude, longitude, date_created in events:
+        latitude, longitude = float(latitude), float(longitude)
+        shared = defaultdict(int)
+        for category in categories[pk]:
+            for profile_id in mentors.get(category, ()):
+                shared[profile_id] += 1
+        for profile_id, count in shared.items():
+            user_id, mentor_latitude, mentor_longitude = profiles[profile_id]
+            distance = great_circle_distance(latitude, longitude, mentor_latitude, mentor_longitude)
+            value = score(count, skills[profile_id], distance, date_created)
+            entries.append((user_id, pk, value))
+    _replace(entries, event_id__in=event_ids)
+
+
+def _run(refresh, keys):
+    close_old_connections()
+    try:
+        refresh(keys)
+    except Exception:
+        logger.exception('Could not refresh the feeds for %s', keys)
+    finally:
+        connection.close()
+
+
+def refresh_later(refresh, keys):
+    """
+    Queues `refresh(keys)` (refresh_events or refresh_mentors) on the feed
+    worker, BATCH_SIZE keys at a time.
+
+    SQLite (the development database) takes one writer at a time, and a
+    background writer would deadlock with the transactions of requests:
+    there the refresh runs right away instead.
+    """
+    keys = sorted(keys)
+    for start in range(0, len(keys), BATCH_SIZE):
+        batch = keys[start:start + BATCH_SIZE]
+        if connection.vendor == 'sqlite':
+            refresh(batch)
+        else:
+            pool.submit(_run, refresh, batch)
+
+
+def rebuild_all(batch_size=BATCH_SIZE):
+    """
+    Rebuilds every feed, `batch_size` events at a time.
+    """
+    event_ids = list(Event.objects.filter(is_open=True).values_list('pk', flat=True))
+    FeedEntry.objects.all().delete()
+    for start in range(0, len(event_ids), batch_size):
+        refresh_events(event_ids[start:start + batch_size])
@@ -0,0 +1,75 @@
+"""
+Sparse fieldsets for the event serializers.
+
+`?fields=id,event_name` renders only the named fields and `?expand=` lists
+the expandable fields (the ones that cost extra queries, such as
+`categories` and `responses`) to include. Expandable fields are included
+by default, unless the client passes `?fields=` without naming them or an
+`?expand=` that leaves them out. The chosen field names are also handed to
+optimise_queryset() and compile_serializer(), so the query only loads the
+columns and relations that end up in the response.
+"""
+from rest_framework.exceptions import ValidationError
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _split(value):
+    return [name for name in (part.strip() for part in value.split(',')) if name]
+
+
+def _check(param, names, allowed):
+    unknown = [name for name in names if name not in allowed]
+    if unknown:
+        raise ValidationError({param: [
+            'Unknown field(s): %s. Choose from: %s.' % (
+                ', '.join(unknown), ', '.join(allowed))
+        ]})
+
+
+def requested_fields(serializer_class, request):
+    """
+    Returns the names of the `serializer_class` fields the request asks for,
+    in declaration order, or None if it asks for the default representation.
+    Raises ValidationError for names the serializer does not have.
+    """
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return None
+
+    names = list(serializer_class._declared_fields)
+    expandable = getattr(serializer_class, 'expandable_fields', ())
+    expand = None
+    if EXPAND_PARAM in params:
+        expand = _split(params[EXPAND_PARAM])
+        _check(EXPAND_PARAM, expand, expandable)
+
+    if FIELDS_PARAM in params:
+        selected = _split(params[FIELDS_PARAM])
+        _check(FIELDS_PARAM, selected, names)
+        selected = set(selected) | set(expand or ())
+    else:
+        selected = set(names).difference(expandable).union(
+            expandable if expand is None else expand)
+    return tuple(name for name in names if name in selected)
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin dropping the fields a request did not ask for. Pass
+    `fields=` explicitly, or a `request` in the context to read `?fields=`
+    and `?expand=` from it.
+    """
+    expandable_fields = ()
+
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None:
+            request = self.context.get('request')
+            if request is not None:
+                fields = requested_fields(type(self), request)
+        if fields is not None:
+            for name in list(self.fields):
+                if name not in fields:
+                    self.fields.pop(name)
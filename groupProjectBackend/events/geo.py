@@ -0,0 +1,93 @@
+from math import asin, cos, degrees, radians, sin
+
+from django.db.models import F, Q
+from django.db.models.functions import ATan2, Cos, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6378.137
+
+
+def bounding_box(latitude, longitude, kms):
+    """
+    Returns the lat/lon ranges that contain every point within `kms` of the
+    given coordinates as (min_lat, max_lat, [(min_lon, max_lon), ...]).
+    The longitude range is split in two when it crosses the antimeridian.
+    """
+    angular = kms / EARTH_RADIUS_KM
+    min_lat = latitude - degrees(angular)
+    max_lat = latitude + degrees(angular)
+    if min_lat <= -90 or max_lat >= 90 or angular >= 1:
+        # A pole is inside the circle (or the circle is huge): all longitudes
+        return max(min_lat, -90), min(max_lat, 90), [(-180, 180)]
+
+    delta_lon = degrees(asin(min(1, sin(angular) / cos(radians(latitude)))))
+    min_lon = longitude - delta_lon
+    max_lon = longitude + delta_lon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180), (-180, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180), (-180, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def bounding_box_filter(latitude, longitude, kms, prefix=''):
+    """
+    Indexable range predicate on latitude/longitude that prunes everything
+    that cannot be within `kms`.
+    """
+    min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, kms)
+    condition = Q()
+    for min_lon, max_lon in lon_ranges:
+        condition |= Q(**{prefix + 'longitude__range': (min_lon, max_lon)})
+    return Q(**{prefix + 'latitude__range': (min_lat, max_lat)}) & condition
+
+
+def distance_expression(latitude, longitude, prefix=''):
+    """
+    Great Circle (haversine) distance in kms from the given coordinates to
+    the row's latitude/longitude columns.
+    """
+    row_latitude = Radians(F(prefix + 'latitude'))
+    row_longitude = Radians(F(prefix + 'longitude'))
+    haversine = (
+        Sin((row_latitude - Radians(latitude)) / 2) ** 2
+        + Cos(Radians(latitude)) * Cos(row_latitude)
+        * Sin((row_longitude - Radians(longitude)) / 2) ** 2
+    )
+    return EARTH_RADIUS_KM * (2 * ATan2(Sqrt(haversine), Sqrt(1 - haversine)))
+
+
+def within_distance(queryset, latitude, longitude, kms):
+    """
+    Annotates `distance` on the events within `kms`, closest first.
+    The bounding box is applied before the (expensive) exact distance.
+    """
+    return queryset.filter(
+        bounding_box_filter(latitude, longitude, kms)
+    ).annotate(
+        distance=distance_expression(latitude, longitude)
+    ).filter(distance__lte=kms).order_by('distance', 'id')
+
+
+def nearest(queryset, latitude, longitude, k, max_kms=20038):
+    """
+    The k closest events, found by widening the radius until enough
+    candidates are inside it.
+    """
+    kms = 10
+    while True:
+        events = list(within_distance(queryset, latitude, longitude, kms)[:k])
+        if len(events) >= k or kms >= max_kms:
+            return events
+        kms = min(kms * 4, max_kms)
+
+
+def great_circle_distance(lat1, lon1, lat2, lon2):
+    """
+    Python version of distance_expression(), in kms.
+    """
+    lat1, lon1, lat2, lon2 = map(radians, (lat1, lon1, lat2, lon2))
+    haversine = (
+        sin((lat2 - lat1) / 2) ** 2
+        + cos(lat1) * cos(lat2) * sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * asin(min(1, haversine ** 0.5))
@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from events.geo import distance_expression, within_distance
+from events.models import Event
+
+PERTH = (-31.95351, 115.85705)
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the full-scan distance query with the bounding box path '
+        'on generated events. Runs inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options['events'])
+            latitude, longitude = PERTH
+            for kms in (5, 25, 100, 1000):
+                full_time, full_ids = self.best_of(
+                    lambda: self.full_scan(latitude, longitude, kms), options['repeat'])
+                box_time, box_ids = self.best_of(
+                    lambda: self.bounding_box(latitude, longitude, kms), options['repeat'])
+                self.stdout.write(
+                    '%5d km: full scan %.3fs, bounding box %.3fs, speedup x%.1f, same results: %s' % (
+                        kms, full_time, box_time, full_time / box_time, full_ids == box_ids)
+                )
+            transaction.set_rollback(True)
+
+    def populate(self, count):
+        organiser = get_user_model().objects.create(
+            username='benchmark-org', is_org=True)
+        now = timezone.now()
+        rng = random.Random(0)
+        Event.objects.bulk_create([
+            Event(
+                event_name='Event %d' % i,
+                event_description='Generated event %d' % i,
+                event_image='https://via.placeholder.com/300.jpg',
+                event_datetime_start=now,
+                event_datetime_end=now,
+                latitude=round(rng.uniform(-44, -10), 6),
+                longitude=round(rng.uniform(113, 154), 6),
+                organiser=organiser,
+            )
+            for i in range(count)
+        ])
+
+    def full_scan(self, latitude, longitude, kms):
+        events = Event.objects.annotate(
+            distance=distance_expression(latitude, longitude)
+        ).filter(distance__lte=kms).order_by('distance', 'id')[:30]
+        return [event.id for event in events]
+
+    def bounding_box(self, latitude, longitude, kms):
+        events = within_distance(Event.objects.all(), latitude, longitude, kms)[:30]
+        return [event.id for event in events]
+
+    def best_of(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
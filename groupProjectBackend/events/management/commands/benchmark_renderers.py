@@ -0,0 +1,86 @@
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from events.compiled import compile_serializer
+from events.models import Category, Event
+from events.renderers import MessagePackRenderer, ORJSONRenderer
+from events.serializers import EventSerializer
+
+RENDERERS = [
+    ('json', JSONRenderer),
+    ('orjson', ORJSONRenderer),
+    ('msgpack', MessagePackRenderer),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares the time and payload size of rendering an event list with '
+        'the stock JSONRenderer, ORJSONRenderer and MessagePackRenderer. Runs '
+        'inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options['events'])
+            compiled = compile_serializer(EventSerializer, Event)
+            data = compiled.serialize(compiled.values(Event.objects.all()))
+            transaction.set_rollback(True)
+
+        # Serializer output holds strings; also time the raw types a view may
+        # hand to the renderer directly
+        now = timezone.now()
+        raw = [
+            {'pk': item['id'], 'latitude': Decimal('-31.95%04d' % i),
+             'longitude': Decimal('115.86%04d' % i), 'start': now, 'end': now}
+            for i, item in enumerate(data)
+        ]
+        expected = JSONRenderer().render(data)
+        for label, payload in [('serialized', data), ('raw', raw)]:
+            baseline = None
+            for name, renderer_class in RENDERERS:
+                renderer = renderer_class()
+                seconds, body = self.best_of(renderer, payload, options['repeat'])
+                baseline = baseline or seconds
+                line = '%s %s: %.1f ms, %d bytes, x%.1f' % (
+                    label, name, seconds * 1000, len(body), baseline / seconds)
+                if label == 'serialized' and name == 'orjson':
+                    line += ', same bytes as JSONRenderer: %s' % (body == expected)
+                self.stdout.write(line)
+
+    def populate(self, count):
+        organiser = get_user_model().objects.create(username='benchmark-org', is_org=True)
+        category, _ = Category.objects.get_or_create(category='Python')
+        now = timezone.now()
+        Event.objects.bulk_create([
+            Event(
+                event_name='Event %d' % i,
+                event_description='Generated event %d – Perth’s meetup' % i,
+                event_image='https://via.placeholder.com/300.jpg',
+                event_datetime_start=now,
+                event_datetime_end=now,
+                organiser=organiser,
+            )
+            for i in range(count)
+        ])
+        category.events.add(*Event.objects.filter(organiser=organiser))
+
+    def best_of(self, renderer, payload, repeat):
+        best = None
+        body = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = renderer.render(payload, renderer.media_type, {})
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
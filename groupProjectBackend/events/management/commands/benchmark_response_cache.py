@@ -0,0 +1,84 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.utils import timezone
+
+from events.models import Category, Event, Register
+from events.response_cache import EVENTS, REGISTRATIONS, bump_generation
+
+ENDPOINTS = [
+    '/events/',
+    '/events/most-popular/short-list/',
+    '/events/categories/Python/events/short-list/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures anonymous requests/sec of the home page lists with every '
+        'request missing the response cache, then with a warm cache. Runs '
+        'inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=2000)
+        parser.add_argument('--requests', type=int, default=200)
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_ACCEPT='application/json')
+        try:
+            with transaction.atomic():
+                self.populate(options['events'])
+                for url in ENDPOINTS:
+                    cold_rate, cold_body = self.rate(client, url, options['requests'], miss=True)
+                    warm_rate, warm_body = self.rate(client, url, options['requests'], miss=False)
+                    self.stdout.write(
+                        '%s: uncached %.0f req/s, cached %.0f req/s, speedup x%.1f, same body: %s' % (
+                            url, cold_rate, warm_rate, warm_rate / cold_rate, cold_body == warm_body)
+                    )
+                transaction.set_rollback(True)
+        finally:
+            # Orphan the entries computed from the rolled back rows
+            bump_generation(EVENTS)
+            bump_generation(REGISTRATIONS)
+
+    def populate(self, count):
+        User = get_user_model()
+        organiser = User.objects.create(username='benchmark-org', is_org=True)
+        User.objects.bulk_create([
+            User(username='benchmark-mentor-%d' % i) for i in range(20)
+        ])
+        mentors = list(User.objects.filter(username__startswith='benchmark-mentor-'))
+        category, _ = Category.objects.get_or_create(category='Python')
+        now = timezone.now()
+        Event.objects.bulk_create([
+            Event(
+                event_name='Event %d' % i,
+                event_description='Generated event %d' % i,
+                event_image='https://via.placeholder.com/300.jpg',
+                event_datetime_start=now,
+                event_datetime_end=now,
+                organiser=organiser,
+            )
+            for i in range(count)
+        ])
+        events = list(Event.objects.filter(organiser=organiser))
+        category.events.add(*events)
+        Register.objects.bulk_create([
+            Register(event=event, mentor=mentor)
+            for event in events[:50] for mentor in mentors[:event.id % len(mentors)]
+        ])
+
+    def rate(self, client, url, count, miss):
+        body = None
+        start = time.perf_counter()
+        for _ in range(count):
+            if miss:
+                bump_generation(EVENTS)
+                bump_generation(REGISTRATIONS)
+            response = client.get(url)
+            body = response.content
+        return count / (time.perf_counter() - start), body
@@ -0,0 +1,90 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from events.compiled import compile_serializer
+from events.models import Category, Event, Register
+from events.optimisation import optimise_queryset
+from events.serializers import EventSerializer, RegisterSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Compares DRF serializers with the compiled fast path on generated '
+        'events. Runs inside a transaction that is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=3)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.populate(options['events'])
+            self.compare('EventSerializer', EventSerializer, Event, options['repeat'])
+            self.compare('RegisterSerializer', RegisterSerializer, Register, options['repeat'])
+            transaction.set_rollback(True)
+
+    def populate(self, count):
+        User = get_user_model()
+        organiser = User.objects.create(username='benchmark-org', is_org=True)
+        mentor = User.objects.create(username='benchmark-mentor')
+        categories = [
+            Category.objects.get_or_create(category='benchmark-%d' % i)[0]
+            for i in range(3)
+        ]
+        now = timezone.now()
+        Event.objects.bulk_create([
+            Event(
+                event_name='Event %d' % i,
+                event_description='Generated event %d' % i,
+                event_image='https://via.placeholder.com/300.jpg',
+                event_datetime_start=now,
+                event_datetime_end=now,
+                organiser=organiser,
+            )
+            for i in range(count)
+        ])
+        events = list(Event.objects.filter(organiser=organiser).values_list('id', flat=True))
+        Through = Event.categories.through
+        Through.objects.bulk_create([
+            Through(event_id=event_id, category_id=category.id)
+            for event_id in events for category in categories
+        ])
+        Register.objects.bulk_create([
+            Register(event_id=event_id, mentor=mentor) for event_id in events
+        ])
+
+    def compare(self, label, serializer_class, model, repeat):
+        renderer = JSONRenderer()
+        queryset = model.objects.order_by('id')
+        compiled = compile_serializer(serializer_class, model)
+
+        def drf():
+            instances = optimise_queryset(queryset.all(), serializer_class)
+            return renderer.render(serializer_class(instances, many=True).data)
+
+        def fast():
+            return renderer.render(compiled.serialize(compiled.values(queryset.all())))
+
+        drf_time, drf_bytes = self.best_of(drf, repeat)
+        fast_time, fast_bytes = self.best_of(fast, repeat)
+        self.stdout.write(
+            '%s (%d rows): DRF %.3fs, compiled %.3fs, speedup x%.1f, identical output: %s' % (
+                label, queryset.count(), drf_time, fast_time,
+                drf_time / fast_time, drf_bytes == fast_bytes,
+            )
+        )
+
+    def best_of(self, func, repeat):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, result
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from events import search
+from events.models import Event
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search document of every event (e.g. after loaddata).'
+
+    def handle(self, *args, **options):
+        search.reindex_all()
+        self.stdout.write('Indexed %d event(s)' % Event.objects.count())
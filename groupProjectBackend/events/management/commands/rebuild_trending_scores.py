@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from events import trending
+
+
+class Command(BaseCommand):
+    help = ('Recomputes Event.trending_score from the registrations '
+            '(run after changing TRENDING_HALF_LIFE_HOURS).')
+
+    def handle(self, *args, **options):
+        total = trending.rebuild_all()
+        self.stdout.write('Scored %d event(s) with registrations' % total)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from events.models import Event, Register
+
+
+class Command(BaseCommand):
+    help = 'Recomputes Event.registration_count from the Register table.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report events whose stored count has drifted.')
+
+    def handle(self, *args, **options):
+        counts = Register.objects.filter(event=OuterRef('pk')).order_by().values(
+            'event').annotate(count=Count('id')).values('count')
+        actual = Coalesce(Subquery(counts), 0)
+
+        with transaction.atomic():
+            drifted = Event.objects.annotate(actual=actual).exclude(
+                registration_count=F('actual'))
+            total = drifted.count()
+            if not options['dry_run']:
+                Event.objects.filter(pk__in=drifted.values('pk')).update(
+                    registration_count=actual)
+
+        verb = 'Found' if options['dry_run'] else 'Fixed'
+        self.stdout.write('%s %d event(s) with a drifted registration count' % (verb, total))
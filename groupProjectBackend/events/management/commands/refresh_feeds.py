@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from events import feed
+from events.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the event feed of every mentor (e.g. after loaddata).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        feed.rebuild_all(options['batch_size'])
+        self.stdout.write('Stored %d feed entry(s)' % FeedEntry.objects.count())
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from events import renditions
+
+
+class Command(BaseCommand):
+    help = ('Renders the event images whose renditions are missing or out of date '
+            '(e.g. still queued when a process stopped).')
+
+    def handle(self, *args, **options):
+        rendered = failed = 0
+        for pk in renditions.missing_renditions().values_list('pk', flat=True):
+            try:
+                renditions.make_renditions(pk)
+            except Exception as error:
+                failed += 1
+                self.stderr.write('Event image %d: %s' % (pk, error))
+            else:
+                rendered += 1
+        self.stdout.write('Rendered %d event image(s), %d failed' % (rendered, failed))
@@ -0,0 +1,213 @@
+"""
+Mentor suggestions for events.
+
+A mentor's match for an event is
+
+    (1 + SKILL_WEIGHT * shared categories / event categories) * proximity
+
+where proximity falls off with the distance between the mentor and the
+event, as in the feed scores of events/feed.py. Mentors sharing none of the
+event's categories are only suggested if they are within MATCH_NEARBY_KM.
+
+Every process keeps the mentors in a MentorIndex: the spatial grid of
+events/spatial.py plus an inverted index from skill to a grid of the mentors
+having it. A query searches growing radii around the event, over all mentors
+up to MATCH_NEARBY_KM and over the grids of the event's categories beyond,
+and stops once nobody further out can beat the current top k: the best match
+possible at distance r is (1 + SKILL_WEIGHT) / (1 + r / DISTANCE_SCALE_KM).
+So it only scores the mentors around the event that could be suggested,
+never all of them. While the index is cold callers fall back to scoring the
+candidates from SQL (suggest_from_database()).
+"""
+import heapq
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import Q
+
+from users.models import MentorProfile
+from .geo import bounding_box_filter, great_circle_distance
+from .spatial import MAX_DISTANCE_KM, SpatialIndex
+
+SKILL_WEIGHT = 4.0
+NEARBY_KM = getattr(settings, 'MATCH_NEARBY_KM', 50)
+# Proximity halves at this distance
+DISTANCE_SCALE_KM = 10
+# Radius of the first search
+START_KM = 10
+
+MentorSkills = MentorProfile.skills.through
+
+
+def match(shared, wanted, distance):
+    """
+    Returns how well a mentor with `shared` of the `wanted` categories of an
+    event, `distance` kms away, matches it, or None if they should not be
+    suggested at all.
+    """
+    share = shared / wanted if wanted else 0.0
+    if not share and distance > NEARBY_KM:
+        return None
+    return (1 + SKILL_WEIGHT * share) / (1 + distance / DISTANCE_SCALE_KM)
+
+
+def best_match_beyond(kms):
+    return (1 + SKILL_WEIGHT) / (1 + kms / DISTANCE_SCALE_KM)
+
+
+class MentorIndex(SpatialIndex):
+    """
+    Spatial index of mentor profiles with, for every skill (category id),
+    a grid of the profiles having it. Values are (point, user_id, skills).
+    """
+
+    def __init__(self, cell_size=0.5, ttl=300):
+        super().__init__(cell_size, ttl)
+        self.mentors = {}
+        self.skill_cells = defaultdict(lambda: defaultdict(set))
+
+    def fetch(self):
+        skills = defaultdict(set)
+        for profile_id, category_id in MentorSkills.objects.values_list(
+                'mentorprofile_id', 'category_id'):
+            skills[profile_id].add(category_id)
+        for pk, user_id, latitude, longitude in MentorProfile.objects.filter(
+                user__isnull=False).values_list('id', 'user_id', 'latitude', 'longitude'):
+            yield pk, ((float(latitude), float(longitude)), user_id, frozenset(skills[pk]))
+
+    def _insert(self, pk, value):
+        point, user_id, skills = value
+        super()._insert(pk, point)
+        self.mentors[pk] = (user_id, skills)
+        cell = self.cell(*point)
+        for skill in skills:
+            self.skill_cells[skill][cell].add(pk)
+
+    def _discard(self, pk):
+        point = self.points.get(pk)
+        super()._discard(pk)
+        entry = self.mentors.pop(pk, None)
+        if entry is None:
+            return
+        cell = self.cell(*point)
+        for skill in entry[1]:
+            cells = self.skill_cells[skill]
+            cells[cell].discard(pk)
+            if not cells[cell]:
+                del cells[cell]
+            if not cells:
+                del self.skill_cells[skill]
+
+    def _get(self, pk):
+        point = self.points.get(pk)
+        if point is None:
+            return None
+        return (point,) + self.mentors[pk]
+
+    def _clear(self):
+        super()._clear()
+        self.mentors = {}
+        self.skill_cells = defaultdict(lambda: defaultdict(set))
+
+    def add(self, pk, user_id, latitude, longitude, skills):
+        super(SpatialIndex, self).add(
+            pk, ((float(latitude), float(longitude)), user_id, frozenset(skills)))
+
+    def _skilled_within(self, latitude, longitude, kms, wanted, skip):
+        """
+        Returns [(distance, pk, entry), ...] for the mentors within `kms`
+        with one of the `wanted` skills, leaving out the pks in `skip`.
+        """
+        with self.lock:
+            found = set()
+            for skill in wanted:
+                cells = self.skill_cells.get(skill)
+                if cells:
+                    found.update(self._cell_members(cells, latitude, longitude, kms))
+            found.difference_update(skip)
+            rows = [(self.points[pk], pk, self.mentors[pk]) for pk in found]
+        skilled = []
+        for point, pk, entry in rows:
+            distance = great_circle_distance(latitude, longitude, *point)
+            if distance <= kms:
+                skilled.append((distance, pk, entry))
+        return skilled
+
+    def suggest(self, latitude, longitude, categories, k, exclude_users=()):
+        """
+        Returns the k best matching mentors for an event at (latitude,
+        longitude) with the category ids `categories`, as [(match, distance,
+        pk), ...] best first, or None if the index is cold. Mentors whose
+        user id is in `exclude_users` are skipped.
+        """
+        if not self.ensure_fresh():
+            return None
+        wanted = frozenset(categories)
+        scored = set()
+        best = []
+        kms = min(START_KM, NEARBY_KM)
+        while True:
+            if kms <= NEARBY_KM:
+                ranked = self.within(latitude, longitude, kms)
+                with self.lock:
+                    rows = [(distance, pk, self.mentors.get(pk))
+                            for distance, pk in ranked if pk not in scored]
+            else:
+                # Further out only mentors sharing a skill can match
+                rows = self._skilled_within(latitude, longitude, kms, wanted, scored)
+            for distance, pk, entry in rows:
+                scored.add(pk)
+                if entry is None or entry[0] in exclude_users:
+                    continue
+                value = match(len(entry[1] & wanted), len(wanted), distance)
+                if value is None:
+                    continue
+                heapq.heappush(best, (value, -distance, -pk))
+                if len(best) > k:
+                    heapq.heappop(best)
+
+            if kms >= MAX_DISTANCE_KM or kms >= NEARBY_KM and not wanted:
+                break
+            if len(best) == k and best[0][0] >= best_match_beyond(kms):
+                break
+            step = min(kms * 4, MAX_DISTANCE_KM)
+            kms = min(step, NEARBY_KM) if kms < NEARBY_KM else step
+        return _ranked((value, -distance, -pk) for value, distance, pk in best)
+
+
+def _ranked(rows):
+    # Best match first, then closest, then oldest profile
+    return sorted(rows, key=lambda row: (-row[0], row[1], row[2]))
+
+
+def suggest_from_database(latitude, longitude, categories, k, exclude_users=()):
+    """
+    Same as MentorIndex.suggest(), from the candidates in the database: the
+    mentors with one of `categories` and the ones in the MATCH_NEARBY_KM
+    bounding box.
+    """
+    wanted = frozenset(categories)
+    candidates = MentorProfile.objects.filter(user__isnull=False).exclude(
+        user_id__in=exclude_users).filter(
+        Q(skills__in=wanted) | bounding_box_filter(latitude, longitude, NEARBY_KM)
+    ).distinct().values_list('id', 'latitude', 'longitude')
+    points = {pk: (float(lat), float(lon)) for pk, lat, lon in candidates}
+    skills = defaultdict(set)
+    for profile_id, category_id in MentorSkills.objects.filter(
+            mentorprofile_id__in=points, category_id__in=wanted).values_list(
+            'mentorprofile_id', 'category_id'):
+        skills[profile_id].add(category_id)
+
+    best = []
+    for pk, (mentor_latitude, mentor_longitude) in points.items():
+        distance = great_circle_distance(latitude, longitude, mentor_latitude, mentor_longitude)
+        value = match(len(skills[pk]), len(wanted), distance)
+        if value is not None:
+            best.append((value, distance, pk))
+    return _ranked(best)[:k]
+
+
+mentors = MentorIndex(
+    cell_size=getattr(settings, 'MENTOR_INDEX_CELL_DEGREES', 0.5),
+    ttl=getattr(settings, 'MENTOR_INDEX_TTL', 300),
+)
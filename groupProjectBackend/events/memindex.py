@@ -0,0 +1,107 @@
+import threading
+import time
+
+
+class InMemoryIndex:
+    """
+    Base class for per-process indexes that are loaded from the database in
+    a background thread and then kept up to date through model signals.
+
+    Subclasses implement fetch() (the rows to load, as (key, value) pairs)
+    and the _insert/_discard/_get/_clear primitives, which are always called
+    with the lock held. Writes made by other processes are picked up by a
+    reload once the index is older than `ttl` seconds.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.loaded_at = None
+        self.loading = False
+        self.refreshing = False
+        self.touched = set()
+
+    @property
+    def ready(self):
+        return self.loaded_at is not None
+
+    def fetch(self):
+        raise NotImplementedError
+
+    def _insert(self, key, value):
+        raise NotImplementedError
+
+    def _discard(self, key):
+        raise NotImplementedError
+
+    def _get(self, key):
+        raise NotImplementedError
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def add(self, key, value):
+        with self.lock:
+            self._discard(key)
+            self._insert(key, value)
+            if self.loading:
+                self.touched.add(key)
+
+    def remove(self, key):
+        with self.lock:
+            self._discard(key)
+            if self.loading:
+                self.touched.add(key)
+
+    def load(self):
+        """
+        (Re)builds the index from the database. Changes that arrive through
+        add()/remove() while the query runs win over the loaded rows.
+        """
+        with self.lock:
+            self.loading = True
+            self.touched = set()
+        try:
+            rows = list(self.fetch())
+        except Exception:
+            with self.lock:
+                self.loading = False
+            raise
+        with self.lock:
+            live = {}
+            for key in self.touched:
+                value = self._get(key)
+                if value is not None:
+                    live[key] = value
+            self._clear()
+            for key, value in rows:
+                if key not in self.touched:
+                    self._insert(key, value)
+            for key, value in live.items():
+                self._insert(key, value)
+            self.touched = set()
+            self.loading = False
+            self.loaded_at = time.monotonic()
+
+    def ensure_fresh(self):
+        """
+        Starts a background (re)load when the index is cold or older than
+        its ttl. Returns whether the index can serve queries right now.
+        """
+        with self.lock:
+            stale = self.loaded_at is None or time.monotonic() - self.loaded_at > self.ttl
+            start = stale and not self.refreshing
+            if start:
+                self.refreshing = True
+        if start:
+            threading.Thread(target=self._background_load, daemon=True).start()
+        return self.ready
+
+    def _background_load(self):
+        from django.db import connection
+
+        try:
+            self.load()
+        finally:
+            self.refreshing = False
+            connection.close()
@@ -0,0 +1,25 @@
+# Generated by Django 3.0.8 on 2026-10-18 11:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0021_eventimage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['date_created', 'id'], name='events_even_date_cr_6bfad6_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_open', 'date_created', 'id'], name='events_even_is_open_3eda09_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['organiser', 'date_created', 'id'], name='events_even_organis_4b4a74_idx'),
+        ),
+    ]
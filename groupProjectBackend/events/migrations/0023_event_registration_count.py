@@ -0,0 +1,33 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_registration_count(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Register = apps.get_model('events', 'Register')
+    counts = Register.objects.filter(event=OuterRef('pk')).order_by().values(
+        'event').annotate(count=Count('id')).values('count')
+    Event.objects.update(registration_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0022_event_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='registration_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_registration_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['registration_count', 'id'], name='events_even_registr_d4a973_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:01
+
+import math
+from datetime import datetime, timezone
+from itertools import groupby
+
+from django.db import migrations, models
+
+# The scoring of events/trending.py at the time of this migration, with its
+# default half-life: migrations must not change with the app code or settings
+DECAY_RATE = math.log(2) / (72 * 3600)
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def score_from_registrations(dates):
+    score = None
+    for date_registered in dates:
+        weight = DECAY_RATE * (date_registered - EPOCH).total_seconds()
+        if score is None:
+            score = weight
+        else:
+            high, low = max(score, weight), min(score, weight)
+            score = high + math.log1p(math.exp(low - high))
+    return score
+
+
+def populate_trending_score(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    Register = apps.get_model('events', 'Register')
+    registrations = Register.objects.order_by('event_id').values_list(
+        'event_id', 'date_registered').iterator()
+    for event_id, rows in groupby(registrations, key=lambda row: row[0]):
+        Event.objects.filter(pk=event_id).update(
+            trending_score=score_from_registrations(date for _, date in rows))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0023_event_registration_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='trending_score',
+            field=models.FloatField(editable=False, null=True),
+        ),
+        migrations.RunPython(populate_trending_score, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_open', 'trending_score', 'id'], name='events_even_is_open_687cf5_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0024_event_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['latitude', 'longitude'], name='events_even_latitud_fbe0e6_idx'),
+        ),
+    ]
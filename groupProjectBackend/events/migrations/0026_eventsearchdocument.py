@@ -0,0 +1,135 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:06
+
+from collections import defaultdict
+
+import django.contrib.postgres.search
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Migrations must not change with the app code: the triggers and document
+# format below are the ones of this migration, not of events/search.py
+FTS_TABLE = 'events_eventsearch_fts'
+DOCUMENT_TABLE = 'events_eventsearchdocument'
+BATCH_SIZE = 500
+
+POSTGRES_SETUP = [
+    """
+    CREATE FUNCTION events_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.categories, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.organiser, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.body, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER events_search_vector_trigger
+    BEFORE INSERT OR UPDATE ON {doc}
+    FOR EACH ROW EXECUTE PROCEDURE events_search_vector_update()
+    """,
+    "CREATE INDEX events_search_vector_gin ON {doc} USING gin(search_vector)",
+]
+POSTGRES_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS events_search_vector_trigger ON {doc}",
+    "DROP FUNCTION IF EXISTS events_search_vector_update()",
+    "DROP INDEX IF EXISTS events_search_vector_gin",
+]
+SQLITE_SETUP = [
+    """
+    CREATE VIRTUAL TABLE {fts} USING fts5(
+        name, categories, organiser, body,
+        content='{doc}', content_rowid='event_id', prefix='2 3'
+    )
+    """,
+    """
+    CREATE TRIGGER {fts}_insert AFTER INSERT ON {doc} BEGIN
+        INSERT INTO {fts}(rowid, name, categories, organiser, body)
+        VALUES (new.event_id, new.name, new.categories, new.organiser, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER {fts}_delete AFTER DELETE ON {doc} BEGIN
+        INSERT INTO {fts}({fts}, rowid, name, categories, organiser, body)
+        VALUES ('delete', old.event_id, old.name, old.categories, old.organiser, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER {fts}_update AFTER UPDATE ON {doc} BEGIN
+        INSERT INTO {fts}({fts}, rowid, name, categories, organiser, body)
+        VALUES ('delete', old.event_id, old.name, old.categories, old.organiser, old.body);
+        INSERT INTO {fts}(rowid, name, categories, organiser, body)
+        VALUES (new.event_id, new.name, new.categories, new.organiser, new.body);
+    END
+    """,
+]
+SQLITE_TEARDOWN = [
+    "DROP TRIGGER IF EXISTS {fts}_insert",
+    "DROP TRIGGER IF EXISTS {fts}_delete",
+    "DROP TRIGGER IF EXISTS {fts}_update",
+    "DROP TABLE IF EXISTS {fts}",
+]
+
+
+def _run(schema_editor, setup):
+    for statement in setup.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement.format(fts=FTS_TABLE, doc=DOCUMENT_TABLE))
+
+
+def create_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_SETUP, 'sqlite': SQLITE_SETUP})
+
+
+def drop_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_TEARDOWN, 'sqlite': SQLITE_TEARDOWN})
+
+
+def populate_documents(apps, schema_editor):
+    Event = apps.get_model('events', 'Event')
+    EventSearchDocument = apps.get_model('events', 'EventSearchDocument')
+    categories = defaultdict(list)
+    for event_id, category in Event.categories.through.objects.values_list(
+            'event_id', 'category__category').iterator():
+        categories[event_id].append(category)
+
+    documents = []
+    for pk, name, description, location, username, company_name in Event.objects.values_list(
+            'pk', 'event_name', 'event_description', 'event_location',
+            'organiser__username', 'organiser__org_profile__company_name').iterator():
+        documents.append(EventSearchDocument(
+            event_id=pk,
+            name=name,
+            categories=' '.join(categories[pk]),
+            organiser=' '.join(filter(None, [username, company_name])),
+            body=' '.join(filter(None, [description, location])),
+        ))
+        if len(documents) == BATCH_SIZE:
+            EventSearchDocument.objects.bulk_create(documents)
+            documents = []
+    EventSearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0025_event_coordinates_index'),
+        ('users', '0013_auto_20201113_1145'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSearchDocument',
+            fields=[
+                ('event', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='events.Event')),
+                ('name', models.TextField()),
+                ('categories', models.TextField(blank=True)),
+                ('organiser', models.TextField(blank=True)),
+                ('body', models.TextField(blank=True)),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(editable=False, null=True)),
+            ],
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
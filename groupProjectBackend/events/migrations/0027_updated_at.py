@@ -0,0 +1,33 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:13
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def populate_updated_at(apps, schema_editor):
+    # Best known lower bound for rows that predate the column
+    Event = apps.get_model('events', 'Event')
+    Register = apps.get_model('events', 'Register')
+    Event.objects.update(updated_at=F('date_created'))
+    Register.objects.update(updated_at=F('date_registered'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0026_eventsearchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='register',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(populate_updated_at, migrations.RunPython.noop),
+    ]
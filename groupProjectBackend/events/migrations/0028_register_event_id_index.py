@@ -0,0 +1,17 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0027_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='register',
+            index=models.Index(fields=['event', 'id'], name='events_regi_event_i_aa7626_idx'),
+        ),
+    ]
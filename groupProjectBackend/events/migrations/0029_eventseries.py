@@ -0,0 +1,65 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:33
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('events', '0028_register_event_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventSeries',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event_name', models.CharField(max_length=120)),
+                ('event_description', models.TextField(max_length=500)),
+                ('event_image', models.URLField(max_length=120)),
+                ('is_open', models.BooleanField(default=True)),
+                ('date_created', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('event_location', models.CharField(default='Perth, WA, Australia', max_length=300)),
+                ('latitude', models.DecimalField(decimal_places=10, default=-31.95351, max_digits=15)),
+                ('longitude', models.DecimalField(decimal_places=10, default=115.85705, max_digits=15)),
+                ('first_start', models.DateTimeField()),
+                ('duration', models.DurationField()),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], max_length=10)),
+                ('interval', models.PositiveSmallIntegerField(default=1)),
+                ('count', models.PositiveIntegerField(blank=True, null=True)),
+                ('until', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='occurrence',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['is_open', 'event_datetime_start', 'id'], name='events_even_is_open_693d19_idx'),
+        ),
+        migrations.AddField(
+            model_name='eventseries',
+            name='categories',
+            field=models.ManyToManyField(related_name='series', related_query_name='series', to='events.Category'),
+        ),
+        migrations.AddField(
+            model_name='eventseries',
+            name='organiser',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='organiser_series', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='series',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='events.EventSeries'),
+        ),
+        migrations.AddConstraint(
+            model_name='event',
+            constraint=models.UniqueConstraint(fields=('series', 'occurrence'), name='unique_series_occurrence'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+import events.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('events', '0030_feedentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='eventimage',
+            name='renditions_of',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.CreateModel(
+            name='EventImageRendition',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(choices=[('thumbnail', 'Thumbnail'), ('card', 'Card'), ('full', 'Full')], max_length=20)),
+                ('file', models.ImageField(height_field='height', upload_to=events.models.EventImageRendition.upload_rendition_to, width_field='width')),
+                ('width', models.PositiveIntegerField()),
+                ('height', models.PositiveIntegerField()),
+                ('image', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='renditions', to='events.EventImage')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='eventimagerendition',
+            constraint=models.UniqueConstraint(fields=('image', 'name'), name='unique_image_rendition'),
+        ),
+    ]
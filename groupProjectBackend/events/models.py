@@ -1,6 +1,7 @@
 import uuid
 import os
 from django.db import models
+from django.contrib.postgres.search import SearchVectorField
 from django.contrib.auth import get_user_model
 from django.utils.timezone import now
 
@@ -39,6 +40,151 @@ class Event(models.Model):
         related_name='events',
         related_query_name='event'
     )
+    # Number of Register rows, maintained by events/signals.py
+    registration_count = models.PositiveIntegerField(
+        default=0, editable=False)
+    # Log of the time-decayed registration activity (see events/trending.py)
+    trending_score = models.FloatField(null=True, editable=False)
+    # Also bumped by events/signals.py when anything shown by EventDetail
+    # changes (registrations, categories, usernames)
+    updated_at = models.DateTimeField(auto_now=True)
+    # Set on the occurrences of an EventSeries that have been materialised
+    series = models.ForeignKey(
+        'EventSeries',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='occurrences'
+    )
+    occurrence = models.PositiveIntegerField(null=True, blank=True)
+
+    class Meta:
+        # Keyset pagination walks these (see events/pagination.py)
+        indexes = [
+            models.Index(fields=['date_created', 'id']),
+            models.Index(fields=['is_open', 'date_created', 'id']),
+            models.Index(fields=['organiser', 'date_created', 'id']),
+            models.Index(fields=['registration_count', 'id']),
+            models.Index(fields=['is_open', 'trending_score', 'id']),
+            # Bounding box prefilter for location searches (see events/geo.py)
+            models.Index(fields=['latitude', 'longitude']),
+            # Date window lists (see events/recurrence.py)
+            models.Index(fields=['is_open', 'event_datetime_start', 'id']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['series', 'occurrence'], name='unique_series_occurrence'),
+        ]
+
+    # Columns only changed with targeted UPDATEs
+    derived_fields = ('registration_count', 'trending_score')
+
+    def save(self, *args, **kwargs):
+        # Derived fields are only changed with targeted UPDATEs, so a full
+        # save must not write back possibly stale in-memory values
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.derived_fields
+            ]
+        elif kwargs.get('update_fields'):
+            kwargs['update_fields'] = set(kwargs['update_fields']) | {'updated_at'}
+        super().save(*args, **kwargs)
+
+
+class EventSeries(models.Model):
+    """
+    A recurring event. Its occurrences are computed from the recurrence rule
+    when a date window is listed (see events/recurrence.py) and only stored
+    as Event rows once a mentor registers for one.
+    """
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    FREQUENCY_CHOICES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+    ]
+
+    event_name = models.CharField(max_length=120)
+    event_description = models.TextField(max_length=500)
+    event_image = models.URLField(max_length=120)
+    is_open = models.BooleanField(default=True)
+    date_created = models.DateTimeField(auto_now_add=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+    event_location = models.CharField(
+        max_length=300, default="Perth, WA, Australia")
+    latitude = models.DecimalField(
+        max_digits=15, decimal_places=10, default=-31.95351)
+    longitude = models.DecimalField(
+        max_digits=15, decimal_places=10, default=115.85705)
+    organiser = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='organiser_series'
+    )
+    categories = models.ManyToManyField(
+        Category,
+        related_name='series',
+        related_query_name='series'
+    )
+    # Recurrence rule: `count` occurrences (or until `until`, or forever)
+    # every `interval` days/weeks, starting at `first_start`
+    first_start = models.DateTimeField()
+    duration = models.DurationField()
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    interval = models.PositiveSmallIntegerField(default=1)
+    count = models.PositiveIntegerField(null=True, blank=True)
+    until = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return self.event_name
+
+
+class FeedEntry(models.Model):
+    """
+    One open event in a mentor's personalised feed, with its score (see
+    events/feed.py, which keeps these rows up to date)
+    """
+    mentor = models.ForeignKey(
+        get_user_model(),
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    event = models.ForeignKey(
+        'Event',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    score = models.FloatField()
+
+    class Meta:
+        # A feed page is one range scan of this index
+        indexes = [
+            models.Index(fields=['mentor', 'score', 'event']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['mentor', 'event'], name='unique_feed_entry'),
+        ]
+
+
+class EventSearchDocument(models.Model):
+    """
+    Denormalised search text for an event, kept up to date by events/search.py.
+    The inverted index over it is maintained by database triggers: a GIN
+    indexed tsvector on PostgreSQL, an FTS5 table on SQLite.
+    """
+    event = models.OneToOneField(
+        'Event',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    name = models.TextField()
+    categories = models.TextField(blank=True)
+    organiser = models.TextField(blank=True)
+    body = models.TextField(blank=True)
+    # Only populated on PostgreSQL
+    search_vector = SearchVectorField(null=True, editable=False)
 
 
 class EventImage(models.Model):
@@ -63,6 +209,41 @@ class EventImage(models.Model):
     )
     image = models.ImageField(
         upload_to=upload_image_to, editable=True, null=True, blank=True)
+    # Name of the upload the current renditions were made from
+    renditions_of = models.CharField(max_length=100, blank=True, default='')
+
+
+class EventImageRendition(models.Model):
+    """
+    A resized copy of an EventImage, made by events/renditions.py
+    """
+    THUMBNAIL = 'thumbnail'
+    CARD = 'card'
+    FULL = 'full'
+    NAME_CHOICES = [
+        (THUMBNAIL, 'Thumbnail'),
+        (CARD, 'Card'),
+        (FULL, 'Full'),
+    ]
+
+    def upload_rendition_to(instance, filename):
+        return 'events/%s/%s' % (now().strftime("%Y%m%d"), filename)
+
+    image = models.ForeignKey(
+        EventImage,
+        on_delete=models.CASCADE,
+        related_name='renditions'
+    )
+    name = models.CharField(max_length=20, choices=NAME_CHOICES)
+    file = models.ImageField(
+        upload_to=upload_rendition_to, width_field='width', height_field='height')
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['image', 'name'], name='unique_image_rendition'),
+        ]
 
 
 class Register(models.Model):
@@ -78,3 +259,10 @@ class Register(models.Model):
     )
     date_registered = models.DateTimeField(auto_now_add=True, editable=False)
     attended = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Walked by the registrations pagination (see events/pagination.py)
+        indexes = [
+            models.Index(fields=['event', 'id']),
+        ]
@@ -0,0 +1,150 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+from .fieldsets import SparseFieldsetMixin, requested_fields
+
+_plans = {}
+
+
+def _walk_source(model, source_attrs):
+    """
+    Follows a dotted serializer source through the model's relations.
+
+    Returns the relation path that needs to be loaded and whether it crosses
+    a to-many relation (prefetch) or only to-one relations (select_related).
+    """
+    path = []
+    many = False
+    for attr in source_attrs:
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            break
+        # `event_id` style sources read the column, not the relation
+        if not field.is_relation or attr != field.name:
+            break
+        path.append(attr)
+        many = many or field.many_to_many or field.one_to_many
+        model = field.related_model
+    return '__'.join(path), many, model
+
+
+def _column(model, name):
+    """Returns `name` if it is a concrete column of `model`, else None"""
+    try:
+        field = model._meta.get_field(name)
+    except FieldDoesNotExist:
+        return None
+    return name if field.concrete and not field.many_to_many else None
+
+
+def get_plan(serializer_class, model, fields=None):
+    """
+    Derives (select_related, prefetch_related, only) lookups from the declared
+    sources of a serializer. Nested serializers are planned recursively so
+    e.g. `responses -> mentor` becomes a Prefetch with its own select_related.
+
+    `fields` restricts the plan to those serializer fields (see
+    events/fieldsets.py); `only` then lists the columns they read, or is
+    None if they need whole rows. Plans are cached per (serializer, model,
+    fields).
+    """
+    key = (serializer_class, model, fields)
+    if key in _plans:
+        return _plans[key]
+
+    select = set()
+    prefetch = {}
+    only = set()
+    for name, field in serializer_class().fields.items():
+        if field.write_only or (fields is not None and name not in fields):
+            continue
+        if field.source == '*':
+            only = None
+            continue
+        child = None
+        if isinstance(field, serializers.ListSerializer):
+            child = field.child
+        elif isinstance(field, serializers.BaseSerializer):
+            child = field
+
+        path, many, related_model = _walk_source(model, field.source_attrs)
+        if not path:
+            # Sources that are not columns (e.g. annotations) load nothing
+            column = _column(model, field.source_attrs[0])
+            if only is not None and column:
+                only.add(column)
+            continue
+        if isinstance(field, serializers.ManyRelatedField):
+            many = True
+
+        if many:
+            prefetch[path] = (related_model, type(child) if child else None)
+        else:
+            select.add(path)
+            if child is not None:
+                child_select, child_prefetch, _ = get_plan(type(child), related_model)
+                select.update('%s__%s' % (path, name) for name in child_select)
+                for name, plan in child_prefetch.items():
+                    prefetch['%s__%s' % (path, name)] = plan
+                only = None
+            elif only is not None:
+                # e.g. `organiser.username`: the foreign key and one column
+                # of the joined row
+                attrs = field.source_attrs[len(path.split('__')):]
+                column = attrs and _column(related_model, attrs[0])
+                only.add(path)
+                if column:
+                    only.add('%s__%s' % (path, column))
+                else:
+                    only = None
+
+    _plans[key] = (tuple(sorted(select)), prefetch,
+                   tuple(sorted(only)) if only is not None else None)
+    return _plans[key]
+
+
+def optimise_queryset(queryset, serializer_class, fields=None, keep=()):
+    """
+    Applies the select_related/prefetch_related lookups a serializer needs so
+    that serializing a whole page runs in a constant number of queries.
+
+    When `fields` is given only those serializer fields are planned and the
+    query is narrowed with `.only()`; `keep` names further columns the view
+    reads itself (pagination keys, coordinates...).
+    """
+    select, prefetch, only = get_plan(serializer_class, queryset.model, fields)
+    if select:
+        queryset = queryset.select_related(*select)
+    if fields is not None and only is not None:
+        keep = [name for name in keep if _column(queryset.model, name)]
+        queryset = queryset.only(*only, *keep)
+    for path, (related_model, child_class) in prefetch.items():
+        if child_class is None:
+            queryset = queryset.prefetch_related(path)
+            continue
+        related_queryset = optimise_queryset(
+            related_model._default_manager.all(), child_class)
+        queryset = queryset.prefetch_related(
+            Prefetch(path, queryset=related_queryset))
+    return queryset
+
+
+class OptimisedQuerysetMixin:
+    """
+    Opt-in mixin for generic views: loads everything `serializer_class`
+    reads from related models up front, and only what `?fields=` asks for
+    if the serializer supports sparse fieldsets.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        serializer_class = self.get_serializer_class()
+        fields = None
+        if issubclass(serializer_class, SparseFieldsetMixin):
+            fields = requested_fields(serializer_class, self.request)
+        ordering = getattr(self.paginator, 'ordering', ())
+        return optimise_queryset(
+            queryset, serializer_class, fields,
+            keep=[field.lstrip('-') for field in ordering])
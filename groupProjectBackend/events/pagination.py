@@ -0,0 +1,216 @@
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def _encode_value(value):
+    # Keep full precision: microseconds matter when comparing timestamps
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on a tuple of (indexed) columns.
+
+    Each page is fetched with a `WHERE (a, b) < (x, y)` style predicate and a
+    LIMIT, so page N costs the same as page 1 - there is no OFFSET scan.
+    `ordering` must end with a unique column (normally `id`) so the key is total.
+    """
+    page_size = 30
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    ordering = ('-date_created', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        return self.paginate(queryset)
+
+    def embed_first_page(self, queryset, url):
+        """
+        Fetches the first page of `queryset` for embedding in another
+        resource; the cursor links then point at `url`, the full list.
+        """
+        self.base_url = url
+        self.cursor = None
+        return self.paginate(queryset)
+
+    def paginate(self, queryset):
+        reverse, position = self.cursor if self.cursor else (False, None)
+        ordering = self.get_ordering(reverse)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            position = self.parse_position(queryset, position)
+            queryset = queryset.filter(self.keyset_filter(ordering, position))
+
+        # Fetch one extra row to find out if there is anything past this page
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, reverse=False):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            field[1:] if field.startswith('-') else '-' + field
+            for field in self.ordering
+        )
+
+    def parse_position(self, queryset, position):
+        """
+        Converts the values of a decoded cursor to the types of the ordering
+        fields (model fields or annotations of `queryset`). Raises NotFound
+        for values that do not fit, instead of failing in the query.
+        """
+        values = []
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            annotation = queryset.query.annotations.get(name)
+            if annotation is not None:
+                model_field = annotation.output_field
+            else:
+                model_field = queryset.model._meta.get_field(name)
+            try:
+                if value is None or isinstance(value, (dict, list)):
+                    raise ValueError
+                values.append(model_field.to_python(value))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def keyset_filter(self, ordering, position):
+        """
+        Expands the row comparison `(f1, f2, ...) > (v1, v2, ...)` (in ordering
+        direction) into `f1 > v1 OR (f1 = v1 AND f2 > v2) OR ...`.
+        """
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+            condition |= Q(**equal, **{lookup: value})
+            equal[name] = value
+        return condition
+
+    def get_position(self, instance):
+        # Pages may hold model instances or `.values()` rows
+        if isinstance(instance, dict):
+            values = [instance[field.lstrip('-')] for field in self.ordering]
+        else:
+            values = [getattr(instance, field.lstrip('-')) for field in self.ordering]
+        return [_encode_value(value) for value in values]
+
+    def encode_cursor(self, reverse, position):
+        payload = json.dumps([int(reverse), position], separators=(',', ':'))
+        token = b64encode(payload.encode('utf-8')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            reverse, position = json.loads(b64decode(token.encode('ascii')))
+            if len(position) != len(self.ordering):
+                raise ValueError
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return bool(reverse), position
+
+    def get_next_cursor(self):
+        if not self.has_next:
+            return None
+        if self.page:
+            return False, self.get_position(self.page[-1])
+        # An empty page reached backwards: continue from the same position
+        return False, self.cursor[1]
+
+    def get_previous_cursor(self):
+        if not self.has_previous:
+            return None
+        if self.page:
+            return True, self.get_position(self.page[0])
+        return True, self.cursor[1]
+
+    def get_next_link(self):
+        cursor = self.get_next_cursor()
+        return self.encode_cursor(*cursor) if cursor else None
+
+    def get_previous_link(self):
+        cursor = self.get_previous_cursor()
+        return self.encode_cursor(*cursor) if cursor else None
+
+    def get_cached_response(self, request, next_cursor, previous_cursor, data):
+        """
+        Rebuilds the paginated response for a page served from a cache, given
+        the cursors returned by get_next_cursor()/get_previous_cursor().
+        """
+        self.base_url = request.build_absolute_uri()
+        return Response(OrderedDict([
+            ('next', self.encode_cursor(*next_cursor) if next_cursor else None),
+            ('previous', self.encode_cursor(*previous_cursor) if previous_cursor else None),
+            ('results', data),
+        ]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+
+class NewestEventsPagination(KeysetPagination):
+    ordering = ('-date_created', '-id')
+
+
+class PopularEventsPagination(KeysetPagination):
+    ordering = ('-registration_count', '-id')
+
+
+class SearchRankPagination(KeysetPagination):
+    ordering = ('-search_rank', '-id')
+
+
+class FeedPagination(KeysetPagination):
+    ordering = ('-feed_score', '-id')
+
+
+class RegistrationsPagination(KeysetPagination):
+    ordering = ('id',)
+    page_size = 20
@@ -0,0 +1,157 @@
+"""
+Occurrences of recurring event series.
+
+The occurrences of an EventSeries are not stored up front. For a date window
+the indexes of the occurrences inside it are computed directly from the
+recurrence rule, so listing a window costs time proportional to the window
+(and the page size), not to the length of the series. An occurrence only
+becomes a real Event row, with `series` and `occurrence` set, when a mentor
+registers for it (materialise()); window listings merge those rows with the
+virtual occurrences of the series.
+
+Occurrences keep the wall-clock time of the first one in the default time
+zone.
+"""
+import heapq
+from datetime import timedelta
+from itertools import islice
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Event, EventSeries
+
+STEPS = {
+    EventSeries.DAILY: timedelta(days=1),
+    EventSeries.WEEKLY: timedelta(weeks=1),
+}
+
+# Copied from the series onto its occurrences
+SERIES_FIELDS = [
+    'event_name', 'event_description', 'event_image', 'is_open',
+    'event_location', 'latitude', 'longitude',
+]
+
+
+def _local(value):
+    return timezone.make_naive(value, timezone.get_default_timezone())
+
+
+def _aware(value):
+    return timezone.make_aware(value, timezone.get_default_timezone(), is_dst=False)
+
+
+def _step(series):
+    return STEPS[series.frequency] * series.interval
+
+
+def occurrence_start(series, index):
+    return _aware(_local(series.first_start) + _step(series) * index)
+
+
+def occurrence_indexes(series, start=None, end=None):
+    """
+    Returns the range of the indexes of the occurrences starting in
+    [start, end). Without `end` the series must be finite.
+    """
+    first = _local(series.first_start)
+    step = _step(series)
+    # -((a - b) // step) is ceil((b - a) / step), exact for timedeltas
+    low = 0 if start is None else max(0, -((first - _local(start)) // step))
+    limits = []
+    if end is not None:
+        limits.append(-((first - _local(end)) // step))
+    if series.count is not None:
+        limits.append(series.count)
+    if series.until is not None:
+        limits.append((_local(series.until) - first) // step + 1)
+    high = min(limits)
+    return range(low, max(low, high))
+
+
+def is_occurrence(series, index):
+    if index < 0:
+        return False
+    if series.count is None and series.until is None:
+        return True
+    return index in occurrence_indexes(series)
+
+
+class Occurrence:
+    """
+    An occurrence of a series that has no Event row yet. Has the attributes
+    EventSerializer reads, plus `series_id` and `occurrence`.
+    """
+    id = None
+    registration_count = 0
+
+    def __init__(self, series, index):
+        for name in SERIES_FIELDS:
+            setattr(self, name, getattr(series, name))
+        self.date_created = series.date_created
+        self.organiser = series.organiser
+        self.categories = list(series.categories.all())
+        self.series_id = series.pk
+        self.occurrence = index
+        self.event_datetime_start = occurrence_start(series, index)
+        self.event_datetime_end = self.event_datetime_start + series.duration
+
+
+def materialise(series, index):
+    """
+    Returns the Event row of occurrence `index` of `series`, creating it
+    (with the series' categories) the first time.
+    """
+    occurrence = Occurrence(series, index)
+    with transaction.atomic():
+        event, created = Event.objects.get_or_create(
+            series=series,
+            occurrence=index,
+            defaults=dict(
+                {name: getattr(occurrence, name) for name in SERIES_FIELDS},
+                event_datetime_start=occurrence.event_datetime_start,
+                event_datetime_end=occurrence.event_datetime_end,
+                organiser_id=series.organiser_id,
+            ),
+        )
+        if created:
+            event.categories.set(occurrence.categories)
+    return event
+
+
+def window_events(events, series, start, end, limit):
+    """
+    Returns up to `limit` open events starting in [start, end), earliest
+    first: the rows of the Event queryset `events` merged with the virtual
+    occurrences of the EventSeries queryset `series`. Occurrences that have
+    been materialised are only listed through their Event row.
+    """
+    rows = list(
+        events.filter(
+            is_open=True, event_datetime_start__gte=start, event_datetime_start__lt=end
+        ).order_by('event_datetime_start', 'id')[:limit]
+    )
+
+    ranges = {}
+    for item in series.filter(is_open=True, first_start__lt=end).exclude(
+            until__lt=start).select_related('organiser').prefetch_related('categories'):
+        indexes = occurrence_indexes(item, start, end)
+        if indexes:
+            ranges[item] = indexes
+    materialised = set()
+    if ranges:
+        window = Q()
+        for item, indexes in ranges.items():
+            window |= Q(series=item, occurrence__gte=indexes.start,
+                        occurrence__lt=indexes.stop)
+        materialised = set(Event.objects.filter(window).values_list('series_id', 'occurrence'))
+
+    def virtual(item, indexes):
+        for index in indexes:
+            if (item.pk, index) not in materialised:
+                yield Occurrence(item, index)
+
+    streams = [islice(virtual(item, indexes), limit) for item, indexes in ranges.items()]
+    merged = heapq.merge(rows, *streams, key=lambda event: event.event_datetime_start)
+    return list(islice(merged, limit))
@@ -0,0 +1,94 @@
+import csv
+import io
+import json
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Types orjson/msgpack do not know (Decimal, lazy strings, querysets...) are
+# converted the same way as by the stock JSONRenderer
+_fallback = JSONEncoder().default
+
+
+def _rows(data):
+    if data is None:
+        return []
+    return data if isinstance(data, list) else [data]
+
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renders a list of flat dicts as CSV with a header row. Large exports
+    stream their rows instead (see events/export.py); this handles the
+    ordinary responses of such views, e.g. errors.
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        rows = _rows(data)
+        if not rows:
+            return b''
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=list(rows[0]), extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        return buffer.getvalue().encode(self.charset)
+
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renders a list as newline delimited JSON, one item per line.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(
+            json.dumps(row, cls=JSONEncoder, ensure_ascii=False) + '\n'
+            for row in _rows(data)
+        ).encode(self.charset)
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    Drop-in replacement for JSONRenderer backed by orjson. Produces the
+    same compact output; datetimes (UTC as `Z`), dates and UUIDs are encoded
+    natively and Decimals become numbers, as with JSONRenderer. Indented
+    output (the browsable API, `; indent=` media types) falls back to the
+    stock encoder.
+    """
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if (not self.compact or self.ensure_ascii
+                or self.get_indent(accepted_media_type, renderer_context or {}) is not None):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(data, default=_fallback, option=self.options)
+        # Keep the output a strict JavaScript subset, like JSONRenderer
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renders MessagePack. Aware datetimes use the MessagePack timestamp type;
+    everything else msgpack does not know is converted like JSONRenderer.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_fallback, use_bin_type=True, datetime=True)
@@ -0,0 +1,152 @@
+"""
+Renditions of uploaded event images.
+
+Uploads are stored as they are and the request returns straight away; the
+renditions (RENDITIONS: the box each one is scaled down to fit) are made
+afterwards on a per-process worker pool, so clients can download an image
+sized for where it is shown instead of the original. Renditions are
+re-encoded from the pixels only, which drops EXIF (after applying its
+orientation), GPS and other metadata: JPEG unless the image has
+transparency, which stays PNG.
+
+EventImage.renditions_of names the upload the current renditions were made
+from, so a replaced image shows no renditions until its new ones are ready.
+Work still queued when a process stops is lost: `manage.py
+render_missing_renditions` renders every image whose renditions are
+missing or out of date.
+"""
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+from PIL import Image, ImageOps
+
+from .models import EventImage, EventImageRendition
+
+logger = logging.getLogger(__name__)
+
+RENDITIONS = {
+    EventImageRendition.THUMBNAIL: (200, 200),
+    EventImageRendition.CARD: (640, 480),
+    EventImageRendition.FULL: (1600, 1600),
+}
+JPEG_QUALITY = getattr(settings, 'IMAGE_RENDITION_QUALITY', 82)
+
+# Pillow releases the GIL while decoding, resizing and encoding, so threads
+# render images in parallel
+pool = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'IMAGE_RENDITION_WORKERS', 2),
+    thread_name_prefix='renditions',
+)
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info)
+
+
+def render(source, box):
+    """
+    Returns the bytes and file extension of `source` (an opened PIL image)
+    scaled down to fit `box`, without its metadata.
+    """
+    image = source.copy()
+    image.thumbnail(box, Image.LANCZOS)
+    alpha = _has_alpha(image)
+    image = image.convert('RGBA' if alpha else 'RGB')
+    # Encoders write the EXIF, ICC profile etc. they find in `info`
+    image.info = {}
+    output = BytesIO()
+    if alpha:
+        image.save(output, 'PNG', optimize=True)
+        return output.getvalue(), 'png'
+    image.save(output, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return output.getvalue(), 'jpg'
+
+
+def make_renditions(image_pk):
+    """
+    Makes the renditions of EventImage `image_pk`, replacing the ones made
+    from a previous upload. Does nothing if they are up to date.
+    """
+    image = EventImage.objects.filter(pk=image_pk).first()
+    if image is None or not image.image or image.renditions_of == image.image.name:
+        return
+    name = image.image.name
+    with image.image.open('rb') as upload:
+        with Image.open(upload) as source:
+            source = ImageOps.exif_transpose(source)
+            files = {
+                rendition: render(source, box) for rendition, box in RENDITIONS.items()
+            }
+
+    stem = uuid.uuid4().hex
+    with transaction.atomic():
+        # Lock the image: a newer upload may have been saved meanwhile
+        if not EventImage.objects.select_for_update().filter(pk=image_pk, image=name).exists():
+            return
+        image.renditions.all().delete()
+        for rendition, (content, extension) in files.items():
+            EventImageRendition.objects.create(
+                image=image,
+                name=rendition,
+                file=ContentFile(content, '%s-%s.%s' % (stem, rendition, extension)),
+            )
+        EventImage.objects.filter(pk=image_pk).update(renditions_of=name)
+
+
+def missing_renditions():
+    """
+    Returns the EventImages whose renditions are missing or were made from
+    a previous upload.
+    """
+    return EventImage.objects.exclude(image='').exclude(image__isnull=True).exclude(
+        renditions_of=F('image'))
+
+
+def _render(image_pk):
+    try:
+        make_renditions(image_pk)
+    except Exception:
+        logger.exception('Could not make the renditions of event image %s', image_pk)
+
+
+def _run(image_pk):
+    close_old_connections()
+    try:
+        _render(image_pk)
+    finally:
+        connection.close()
+
+
+def render_later(image_pk):
+    """
+    Queues the renditions of EventImage `image_pk` on the worker pool.
+
+    As with feed refreshes (see events/feed.py) a background writer would
+    deadlock with the transactions of requests on SQLite: there the
+    renditions are made right away instead.
+    """
+    if connection.vendor == 'sqlite':
+        _render(image_pk)
+    else:
+        pool.submit(_run, image_pk)
+
+
+def render_on_commit(image_pk):
+    """
+    Queues the renditions of EventImage `image_pk` once the current
+    transaction commits.
+    """
+    transaction.on_commit(lambda: render_later(image_pk))
+
+
+def delete_file_on_commit(field_file):
+    storage, name = field_file.storage, field_file.name
+    if name:
+        transaction.on_commit(lambda: storage.delete(name))
@@ -0,0 +1,88 @@
+"""
+Shared response cache for anonymous GETs of the home page lists.
+
+Cached responses are keyed on the current values of the generation counters
+they depend on, so invalidation is a single cache.incr(): after a write
+(see events/signals.py) the next request reads the new counter and misses,
+and the stale entries simply age out. Counters are bumped on commit, so a
+response computed from pre-write data can never be stored under a
+post-write generation.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+EVENTS = 'events'
+REGISTRATIONS = 'registrations'
+TIMEOUT = getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def generation_key(name):
+    return 'response-generation:%s' % name
+
+
+def _initial_generation():
+    # Never reuse the generation of entries written before the counter was
+    # evicted or the cache was restarted
+    return int(time.time() * 1000)
+
+
+def get_generations(names):
+    keys = [generation_key(name) for name in names]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, _initial_generation(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump_generation(name):
+    key = generation_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_generation(), None)
+
+
+def response_key(request, generations):
+    # Bodies hold absolute next/previous links, built from the request host
+    url = hashlib.md5(request.build_absolute_uri().encode('utf-8')).hexdigest()
+    return 'response:%s:%s:%s' % (
+        request.accepted_media_type, '.'.join(map(str, generations)), url)
+
+
+def cache_anonymous_response(*generations):
+    """
+    Decorates an APIView `get` so that responses to anonymous requests are
+    served from the cache until one of the named generations is bumped.
+    The browsable API is never cached (its pages embed per-request forms).
+    """
+    def decorator(method):
+        @wraps(method)
+        def get(view, request, *args, **kwargs):
+            if (request.user.is_authenticated
+                    or request.accepted_renderer.media_type == 'text/html'):
+                return method(view, request, *args, **kwargs)
+
+            key = response_key(request, get_generations(generations))
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+                patch_vary_headers(response, ['Accept'])
+                return response
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                response.add_post_render_callback(
+                    lambda rendered: cache.set(
+                        key, (rendered.content, rendered['Content-Type']), TIMEOUT))
+            return response
+        return get
+    return decorator
@@ -0,0 +1,155 @@
+"""
+Full-text search over events.
+
+Every event has an EventSearchDocument holding its name, categories,
+organiser (username and company name) and body (description and location).
+Python code only keeps those rows up to date (see events/signals.py); the
+inverted index is maintained by database triggers created in migration
+0026_eventsearchdocument:
+
+- PostgreSQL: a weighted tsvector column with a GIN index
+- SQLite: an external-content FTS5 table (local runs)
+
+Other backends fall back to unranked substring matching.
+"""
+import re
+from collections import defaultdict
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connection
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Event, EventSearchDocument
+from .search_cache import search_results
+
+FTS_TABLE = 'events_eventsearch_fts'
+# Relative weights of name, categories, organiser and body
+FTS_WEIGHTS = (10.0, 5.0, 5.0, 1.0)
+BATCH_SIZE = 500
+# Backends with a real (prefix-matching) search index
+INDEXED_VENDORS = ('postgresql', 'sqlite')
+
+
+def build_documents(event_ids):
+    """
+    Returns {event_id: {field: text}} for the search documents of the given
+    events, in two queries.
+    """
+    rows = Event.objects.filter(pk__in=event_ids).values_list(
+        'pk', 'event_name', 'event_description', 'event_location',
+        'organiser__username', 'organiser__org_profile__company_name')
+    categories = defaultdict(list)
+    through = Event.categories.through
+    for event_id, category in through.objects.filter(event_id__in=event_ids).values_list(
+            'event_id', 'category__category'):
+        categories[event_id].append(category)
+
+    documents = {}
+    for pk, name, description, location, username, company_name in rows:
+        documents[pk] = {
+            'name': name,
+            'categories': ' '.join(categories[pk]),
+            'organiser': ' '.join(filter(None, [username, company_name])),
+            'body': ' '.join(filter(None, [description, location])),
+        }
+    return documents
+
+
+def save_documents(event_ids):
+    """
+    Creates or refreshes the search documents of the given events. Deleted
+    events are skipped (their document goes with them).
+    """
+    event_ids = list(event_ids)
+    fields = ['name', 'categories', 'organiser', 'body']
+    for start in range(0, len(event_ids), BATCH_SIZE):
+        batch = event_ids[start:start + BATCH_SIZE]
+        documents = build_documents(batch)
+        existing = set(EventSearchDocument.objects.filter(
+            pk__in=documents).values_list('pk', flat=True))
+        instances = [
+            EventSearchDocument(event_id=pk, **values) for pk, values in documents.items()
+        ]
+        EventSearchDocument.objects.bulk_create(
+            [doc for doc in instances if doc.event_id not in existing])
+        EventSearchDocument.objects.bulk_update(
+            [doc for doc in instances if doc.event_id in existing], fields)
+
+
+def _document_texts(event_ids):
+    return {
+        pk: texts for pk, *texts in EventSearchDocument.objects.filter(
+            pk__in=event_ids).values_list('pk', 'name', 'categories', 'organiser', 'body')
+    }
+
+
+def index_events(event_ids):
+    """
+    Refreshes the search documents of the given events and evicts the cached
+    search results they could affect.
+    """
+    event_ids = list(event_ids)
+    for start in range(0, len(event_ids), BATCH_SIZE):
+        batch = event_ids[start:start + BATCH_SIZE]
+        before = _document_texts(batch)
+        save_documents(batch)
+        after = _document_texts(batch)
+        # Unchanged documents can only affect the pages that show them
+        words = []
+        for pk in batch:
+            if before.get(pk) != after.get(pk):
+                words += before.get(pk, []) + after.get(pk, [])
+        search_results.invalidate(words, batch)
+
+
+def reindex_all():
+    index_events(Event.objects.values_list('pk', flat=True).iterator())
+
+
+def query_terms(query):
+    return re.findall(r'\w+', query.lower())
+
+
+def search_events(query):
+    """
+    Returns the events matching every word of `query` (as a prefix),
+    annotated with `search_rank` (higher is better).
+    """
+    terms = query_terms(query)
+    if not terms:
+        return Event.objects.annotate(
+            search_rank=Value(0.0, output_field=FloatField())).none()
+
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            ' & '.join('%s:*' % term for term in terms),
+            config='english', search_type='raw')
+        return Event.objects.filter(
+            search_document__search_vector=search_query
+        ).annotate(
+            search_rank=SearchRank(F('search_document__search_vector'), search_query)
+        )
+
+    if connection.vendor == 'sqlite':
+        match = ' '.join('"%s"*' % term for term in terms)
+        table = Event._meta.db_table
+        return Event.objects.filter(
+            pk__in=RawSQL('SELECT rowid FROM %s WHERE %s MATCH %%s' % (FTS_TABLE, FTS_TABLE), [match])
+        ).annotate(
+            search_rank=RawSQL(
+                'SELECT -bm25(%s, %s) FROM %s WHERE %s MATCH %%s AND rowid = "%s"."id"' % (
+                    FTS_TABLE, ', '.join(map(str, FTS_WEIGHTS)), FTS_TABLE, FTS_TABLE, table),
+                [match], output_field=FloatField())
+        )
+
+    condition = Q()
+    for term in terms:
+        condition &= (
+            Q(search_document__name__icontains=term)
+            | Q(search_document__categories__icontains=term)
+            | Q(search_document__organiser__icontains=term)
+            | Q(search_document__body__icontains=term)
+        )
+    return Event.objects.filter(condition).annotate(
+        search_rank=Value(0.0, output_field=FloatField()))
@@ -0,0 +1,144 @@
+"""
+Per-process LRU cache of search result pages.
+
+Entries are keyed on the normalised query terms, the page cursor and the
+page size, and hold the serialized page plus its next/previous cursors.
+Invalidation is driven by events/search.py: whenever search documents are
+rewritten, the words of the old and new documents evict the entries whose
+query could match them, and the affected event ids evict the entries that
+contain those events. Entries also expire after `ttl` seconds, which bounds
+how long writes made by other processes can go unnoticed.
+
+Matching is done on the first PREFIX_LENGTH characters of each query term,
+so stemming (PostgreSQL) and accent folding (SQLite) never hide a match;
+the only cost is the occasional unnecessary eviction. Small rank changes
+caused by corpus-wide statistics (document frequencies) are not tracked.
+"""
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+from django.conf import settings
+
+from .autocomplete import normalise
+
+PREFIX_LENGTH = 3
+
+
+def term_prefix(term):
+    return ''.join(normalise(term))[:PREFIX_LENGTH]
+
+
+class SearchResultCache:
+
+    def __init__(self, max_entries=512, ttl=60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.by_prefix = defaultdict(set)
+        self.by_event = defaultdict(set)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        # Bumped by every invalidation, so a page computed while a write
+        # landed is not cached
+        self.generation = 0
+
+    @staticmethod
+    def make_key(terms, cursor, page_size, fields=None):
+        return (tuple(terms), cursor or '', page_size, fields)
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] > self.ttl:
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, event_ids, generation):
+        """
+        Stores `value` for `key`. `event_ids` are the events shown on the page
+        and `generation` the value of `self.generation` read before the page
+        was computed.
+        """
+        prefixes = {term_prefix(term) for term in key[0]}
+        event_ids = set(event_ids)
+        with self.lock:
+            if generation != self.generation:
+                return
+            self._drop(key)
+            self.entries[key] = (time.monotonic(), value, prefixes, event_ids)
+            for prefix in prefixes:
+                self.by_prefix[prefix].add(key)
+            for event_id in event_ids:
+                self.by_event[event_id].add(key)
+            while len(self.entries) > self.max_entries:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return False
+        for prefix in entry[2]:
+            self.by_prefix[prefix].discard(key)
+            if not self.by_prefix[prefix]:
+                del self.by_prefix[prefix]
+        for event_id in entry[3]:
+            self.by_event[event_id].discard(key)
+            if not self.by_event[event_id]:
+                del self.by_event[event_id]
+        return True
+
+    def invalidate(self, words=(), event_ids=()):
+        """
+        Drops the entries that could match any of `words` (document words
+        that were added or removed) or that show any of `event_ids`.
+        """
+        with self.lock:
+            self.generation += 1
+            stale = set()
+            for text in words:
+                for word in normalise(text):
+                    for length in range(1, min(len(word), PREFIX_LENGTH) + 1):
+                        stale.update(self.by_prefix.get(word[:length], ()))
+            for event_id in event_ids:
+                stale.update(self.by_event.get(event_id, ()))
+            for key in stale:
+                if self._drop(key):
+                    self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.invalidations += len(self.entries)
+            self.entries = OrderedDict()
+            self.by_prefix = defaultdict(set)
+            self.by_event = defaultdict(set)
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+search_results = SearchResultCache(
+    max_entries=getattr(settings, 'SEARCH_CACHE_MAX_ENTRIES', 512),
+    ttl=getattr(settings, 'SEARCH_CACHE_TTL', 60),
+)
@@ -2,7 +2,17 @@ from users.models import MentorProfile
 from django.db.models.fields import DateTimeField
 from django.db.models.query import QuerySet
 from rest_framework import serializers
-from .models import Event, Category, Register, EventImage
+from rest_framework.relations import MANY_RELATION_KWARGS
+from .models import Event, EventSeries, Category, Register, EventImage
+from .fieldsets import SparseFieldsetMixin
+from .catalog import categories as category_catalog
+from .compiled import compile_serializer
+from .pagination import RegistrationsPagination
+from .bulk import create_events
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
 
 
 class CategorySerializer(serializers.Serializer):
@@ -16,7 +26,104 @@ class CategorySerializer(serializers.Serializer):
         return Category.objects.create(**validated_data)
 
 
-class EventSerializer(serializers.Serializer):
+def recheck_categories(lists):
+    """
+    Re-checks lists of categories resolved through the catalog against the
+    database before they are linked: linking a category deleted since the
+    catalog was loaded fails with an IntegrityError. Returns, for each
+    list, its current categories and the slugs that no longer exist.
+    """
+    stale = category_catalog.recheck(
+        category for categories in lists for category in categories)
+    checked = []
+    for categories in lists:
+        current, missing = [], []
+        for category in categories:
+            slug = category.category
+            if slug in stale:
+                category = stale[slug]
+            if category is None:
+                missing.append(slug)
+            else:
+                current.append(category)
+        checked.append((current, missing))
+    return checked
+
+
+class CategoryListField(serializers.ManyRelatedField):
+    """
+    Many CategorySlugFields, re-checked in one query (see
+    recheck_categories())
+    """
+
+    def missing_errors(self, slugs):
+        message = self.child_relation.error_messages['does_not_exist']
+        return [message.format(slug_name='category', value=slug) for slug in slugs]
+
+    def to_internal_value(self, data):
+        categories = super().to_internal_value(data)
+        if isinstance(getattr(self.parent, 'parent', None), EventListSerializer):
+            # Re-checked for all the posted events at once
+            return categories
+        [(categories, missing)] = recheck_categories([categories])
+        if missing:
+            raise serializers.ValidationError(self.missing_errors(missing))
+        return categories
+
+
+class CategorySlugField(serializers.SlugRelatedField):
+    """
+    Category slug field resolving slugs through the in-process category
+    catalog (events/catalog.py) instead of one query per slug
+    """
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('slug_field', 'category')
+        kwargs.setdefault('queryset', Category.objects.all())
+        super().__init__(**kwargs)
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return CategoryListField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (str, int)):
+            self.fail('invalid')
+        category = category_catalog.by_slug(str(data))
+        if category is None:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=data)
+        return category
+
+
+class EventListSerializer(serializers.ListSerializer):
+    """
+    Creates a list of events in bulk (see events/bulk.py)
+    """
+
+    def to_internal_value(self, data):
+        rows = super().to_internal_value(data)
+        checked = recheck_categories([row.get('categories', []) for row in rows])
+        errors = []
+        for row, (categories, missing) in zip(rows, checked):
+            if 'categories' in row:
+                row['categories'] = categories
+            field = self.child.fields['categories']
+            errors.append({'categories': field.missing_errors(missing)} if missing else {})
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        return rows
+
+    def create(self, validated_data):
+        return create_events(validated_data)
+
+
+class EventSerializer(SparseFieldsetMixin, serializers.Serializer):
+    expandable_fields = ('categories',)
+
     id = serializers.ReadOnlyField()
     event_name = serializers.CharField(max_length=120)
     event_description = serializers.CharField(max_length=500)
@@ -32,24 +139,125 @@ class EventSerializer(serializers.Serializer):
     longitude = serializers.DecimalField(
         max_digits=15, decimal_places=10, default=115.85705)
     organiser = serializers.ReadOnlyField(source='organiser.username')
-    categories = serializers.SlugRelatedField(
-        many=True, slug_field="category", queryset=Category.objects.all())
+    categories = CategorySlugField(many=True)
 
     def create(self, validated_data):
         categories = validated_data.pop('categories')
-        event = Event.objects.create(**validated_data)
-        event.categories.set(categories)
-        event.save()
+        # One transaction: the on-commit index updates run once, with the
+        # categories in place
+        with transaction.atomic():
+            event = Event.objects.create(**validated_data)
+            event.categories.set(categories)
         return event
 
+    class Meta:
+        list_serializer_class = EventListSerializer
+
+
+class EventDistanceSerializer(EventSerializer):
+    distance = serializers.FloatField(read_only=True)
+
+
+class OccurrenceSerializer(EventSerializer):
+    """
+    An event in a date window: a real event, or a not yet materialised
+    occurrence of a series (with `id` null)
+    """
+    series = serializers.ReadOnlyField(source='series_id')
+    occurrence = serializers.ReadOnlyField()
+
+
+class EventSeriesSerializer(serializers.Serializer):
+    id = serializers.ReadOnlyField()
+    event_name = serializers.CharField(max_length=120)
+    event_description = serializers.CharField(max_length=500)
+    event_image = serializers.URLField(max_length=120)
+    is_open = serializers.BooleanField(default=True)
+    date_created = serializers.DateTimeField(read_only=True)
+    event_location = serializers.CharField(
+        max_length=300,  default="Perth, WA, Australia")
+    latitude = serializers.DecimalField(
+        max_digits=15, decimal_places=10, default=-31.95351)
+    longitude = serializers.DecimalField(
+        max_digits=15, decimal_places=10, default=115.85705)
+    organiser = serializers.ReadOnlyField(source='organiser.username')
+    categories = CategorySlugField(many=True)
+    first_start = serializers.DateTimeField()
+    duration = serializers.DurationField()
+    frequency = serializers.ChoiceField(choices=EventSeries.FREQUENCY_CHOICES)
+    interval = serializers.IntegerField(min_value=1, max_value=365, default=1)
+    count = serializers.IntegerField(min_value=1, required=False, allow_null=True)
+    until = serializers.DateTimeField(required=False, allow_null=True)
+
+    def validate(self, data):
+        if data['duration'] < timedelta(0):
+            raise serializers.ValidationError('duration must not be negative')
+        if data.get('until') is not None and data['until'] < data['first_start']:
+            raise serializers.ValidationError(
+                'until must not be before first_start')
+        return data
+
+    def create(self, validated_data):
+        categories = validated_data.pop('categories')
+        series = EventSeries.objects.create(**validated_data)
+        series.categories.set(categories)
+        return series
+
+
+class WindowQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for the date window event list
+    """
+    start_after = serializers.DateTimeField(required=False)
+    start_before = serializers.DateTimeField(required=False)
+    category = serializers.CharField(max_length=100, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=200, default=50)
+
+    def validate(self, data):
+        start = data.setdefault('start_after', timezone.now())
+        end = data.setdefault('start_before', start + timedelta(days=30))
+        if end <= start:
+            raise serializers.ValidationError(
+                'start_before must be after start_after')
+        return data
+
+
+class LocationQuerySerializer(serializers.Serializer):
+    """
+    Query parameters for the location based event lists
+    """
+    lat = serializers.FloatField(min_value=-90, max_value=90, required=False)
+    lon = serializers.FloatField(min_value=-180, max_value=180, required=False)
+    category = serializers.CharField(max_length=100, required=False)
+    start_after = serializers.DateTimeField(required=False)
+    start_before = serializers.DateTimeField(required=False)
+    sort = serializers.ChoiceField(
+        choices=['distance', 'date'], default='distance')
+
+    def validate(self, data):
+        if ('lat' in data) != ('lon' in data):
+            raise serializers.ValidationError(
+                'lat and lon must be passed together')
+        return data
+
 
 class EventImageSerializer(serializers.ModelSerializer):
     id = serializers.ReadOnlyField()
     event = serializers.ReadOnlyField(source="event.id")
+    renditions = serializers.SerializerMethodField()
 
     class Meta:
         model = EventImage
-        fields = ['id', 'event', 'image', ]
+        fields = ['id', 'event', 'image', 'renditions', ]
+
+    def get_renditions(self, obj):
+        """
+        URLs of the resized copies by name (thumbnail, card, full), empty
+        until the renditions of the current image are ready
+        """
+        if not obj.image or obj.renditions_of != obj.image.name:
+            return {}
+        return {rendition.name: rendition.file.url for rendition in obj.renditions.all()}
 
     def create(self, validated_data):
         print("Validated Data", validated_data)
@@ -95,8 +303,38 @@ class AttendanceSerializer(serializers.Serializer):
         return instance
 
 
+class RegistrationPageField(serializers.Field):
+    """
+    Read-only: the number of registrations of an event and the first page of
+    them, with a cursor link to the rest (events/<pk>/register/), so the size
+    of the detail does not grow with the registrations
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, event):
+        compiled = compile_serializer(RegisterSerializer, Register)
+        url = reverse('event-registrations', kwargs={'pk': event.pk})
+        request = self.context.get('request')
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        paginator = RegistrationsPagination()
+        page = paginator.embed_first_page(
+            compiled.values(Register.objects.filter(event_id=event.pk)), url)
+        return {
+            'count': event.registration_count,
+            'next': paginator.get_next_link(),
+            'results': compiled.serialize(page),
+        }
+
+
 class EventDetailSerializer(EventSerializer):
-    responses = RegisterSerializer(many=True, read_only=True)
+    expandable_fields = ('categories', 'responses')
+
+    responses = RegistrationPageField()
 
     def update(self, instance, validated_data):
 
@@ -161,6 +399,17 @@ class RegisterMentorSerializer(serializers.ModelSerializer):
         fields = ['id', 'mentor', 'attended']
 
 
+class AttendanceEntrySerializer(serializers.Serializer):
+    """One row of a bulk attendance update"""
+    mentor = serializers.CharField(max_length=150)
+    attended = serializers.BooleanField()
+
+
+class AttendanceUpdateSerializer(serializers.Serializer):
+    """The body of a bulk attendance update"""
+    responses = AttendanceEntrySerializer(many=True)
+
+
 class BulkAttendanceUpdateSerializer(serializers.ModelSerializer):
     """
     This allows for bulk update of mentors who attended the event
@@ -171,3 +420,15 @@ class BulkAttendanceUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Event
         fields = ['responses']
+
+
+class SuggestedMentorSerializer(serializers.Serializer):
+    """A mentor suggested for an event, best match first"""
+    id = serializers.ReadOnlyField()
+    user = serializers.ReadOnlyField(source='user.username')
+    name = serializers.ReadOnlyField()
+    mentor_image = serializers.ReadOnlyField()
+    location = serializers.ReadOnlyField()
+    skills = serializers.SlugRelatedField(many=True, read_only=True, slug_field='category')
+    distance = serializers.FloatField(read_only=True)
+    match = serializers.FloatField(read_only=True)
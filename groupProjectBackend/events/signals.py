@@ -0,0 +1,405 @@
+import threading
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from django.contrib.auth import get_user_model
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from users.models import MentorProfile, OrgProfile
+from . import feed, search, trending
+from .response_cache import EVENTS, REGISTRATIONS, bump_generation
+from .autocomplete import CATEGORY, EVENT, ORGANISATION, suggestions
+from .catalog import categories
+from .search_cache import search_results
+from .spatial import open_events
+from .matching import mentors
+from .models import Category, Event, EventImage, EventImageRendition, Register
+from .bulk import events_created
+from .renditions import delete_file_on_commit, render_on_commit
+
+
+@receiver(post_save, sender=Register)
+def increment_registration_count(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        Event.objects.filter(pk=instance.event_id).update(
+            registration_count=F('registration_count') + 1, updated_at=timezone.now())
+        trending.record_registration(instance.event_id, instance.date_registered)
+
+
+@receiver(post_delete, sender=Register)
+def decrement_registration_count(sender, instance, **kwargs):
+    # Also runs for cascades (event or mentor deleted)
+    Event.objects.filter(pk=instance.event_id).update(
+        registration_count=Greatest(F('registration_count') - 1, 0),
+        updated_at=timezone.now())
+    trending.recompute_event(instance.event_id)
+
+
+@receiver(post_save, sender=Event)
+def index_event_location(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.is_open:
+        pk, latitude, longitude = instance.pk, instance.latitude, instance.longitude
+        transaction.on_commit(lambda: open_events.add(pk, latitude, longitude))
+    else:
+        pk = instance.pk
+        transaction.on_commit(lambda: open_events.remove(pk))
+
+
+@receiver(post_delete, sender=Event)
+def unindex_event_location(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: open_events.remove(pk))
+
+
+def batch_on_commit(func):
+    """
+    Returns a function collecting keys until the current transaction
+    commits, then calling `func` once with all of them: an event saved and
+    given its categories in one transaction is processed once.
+    """
+    local = threading.local()
+
+    def add(keys):
+        keys = set(keys)
+        keys.discard(None)
+        if not keys:
+            return
+        pending = getattr(local, 'pending', None)
+        # Still queued: the transaction has neither committed nor rolled back
+        if pending is not None and any(
+                callback is pending[1]
+                for _, callback in transaction.get_connection().run_on_commit):
+            pending[0].update(keys)
+            return
+
+        def flush():
+            func(keys)
+        local.pending = (keys, flush)
+        transaction.on_commit(flush)
+    return add
+
+
+reindex_on_commit = batch_on_commit(search.index_events)
+refeed_events_on_commit = batch_on_commit(
+    lambda event_ids: feed.refresh_later(feed.refresh_events, event_ids))
+refeed_mentors_on_commit = batch_on_commit(
+    lambda user_ids: feed.refresh_later(feed.refresh_mentors, user_ids))
+
+
+@receiver(post_save, sender=Event)
+def index_event_search_document(sender, instance, raw=False, **kwargs):
+    if not raw:
+        reindex_on_commit([instance.pk])
+        refeed_events_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Event)
+def evict_deleted_event_results(sender, instance, **kwargs):
+    # The search document goes with the event, without a re-index
+    pk = instance.pk
+    transaction.on_commit(lambda: search_results.invalidate(event_ids=[pk]))
+
+
+@receiver(m2m_changed, sender=Event.categories.through)
+def index_event_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    # pre_clear: a cleared category has no events left to look up afterwards
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        event_ids = [instance.pk]
+    elif pk_set:
+        event_ids = pk_set
+    else:
+        event_ids = list(instance.events.values_list('pk', flat=True))
+    reindex_on_commit(event_ids)
+    refeed_events_on_commit(event_ids)
+
+
+@receiver(post_save, sender=Category)
+def index_category_events(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        reindex_on_commit(instance.events.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def index_deleted_category_events(sender, instance, **kwargs):
+    # The through rows go without an m2m_changed signal
+    reindex_on_commit(instance.events.values_list('pk', flat=True))
+
+
+def renamed(user, created, raw, update_fields):
+    """
+    Whether a post_save of `user` changed their username (other saves, e.g.
+    of a password, leave what events show of them alone).
+    """
+    if created or raw or (update_fields is not None and 'username' not in update_fields):
+        return False
+    return user.has_changed('username')
+
+
+@receiver(post_save, sender=get_user_model())
+def index_organiser_events(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not renamed(instance, created, raw, update_fields):
+        return
+    reindex_on_commit(instance.organiser_events.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=OrgProfile)
+def index_company_events(sender, instance, raw=False, **kwargs):
+    if not raw and instance.user_id is not None and instance.has_changed('company_name'):
+        reindex_on_commit(
+            Event.objects.filter(organiser_id=instance.user_id).values_list('pk', flat=True))
+
+
+def suggest_on_commit(key, label, identifier):
+    if label:
+        transaction.on_commit(lambda: suggestions.add(key, (label, identifier)))
+    else:
+        transaction.on_commit(lambda: suggestions.remove(key))
+
+
+def unsuggest_on_commit(key):
+    transaction.on_commit(lambda: suggestions.remove(key))
+
+
+@receiver(post_save, sender=Event)
+def suggest_event(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    if instance.is_open:
+        suggest_on_commit((EVENT, instance.pk), instance.event_name, instance.pk)
+    else:
+        unsuggest_on_commit((EVENT, instance.pk))
+
+
+@receiver(post_delete, sender=Event)
+def unsuggest_event(sender, instance, **kwargs):
+    unsuggest_on_commit((EVENT, instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def suggest_category(sender, instance, raw=False, **kwargs):
+    if not raw:
+        suggest_on_commit((CATEGORY, instance.pk), instance.category, instance.category)
+
+
+@receiver(post_delete, sender=Category)
+def unsuggest_category(sender, instance, **kwargs):
+    unsuggest_on_commit((CATEGORY, instance.pk))
+
+
+@receiver(post_save, sender=Category)
+def catalog_category(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pk, slug = instance.pk, instance.category
+        transaction.on_commit(lambda: categories.add(pk, slug))
+
+
+@receiver(post_delete, sender=Category)
+def uncatalog_category(sender, instance, **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: categories.remove(pk))
+
+
+@receiver(post_save, sender=OrgProfile)
+def suggest_organisation(sender, instance, raw=False, **kwargs):
+    if raw or instance.user_id is None:
+        return
+    username = get_user_model().objects.filter(pk=instance.user_id).values_list(
+        'username', flat=True).first()
+    suggest_on_commit((ORGANISATION, instance.user_id), instance.company_name, username)
+
+
+@receiver(post_delete, sender=OrgProfile)
+def unsuggest_organisation(sender, instance, **kwargs):
+    if instance.user_id is not None:
+        unsuggest_on_commit((ORGANISATION, instance.user_id))
+
+
+@receiver(post_save, sender=get_user_model())
+def suggest_renamed_organisation(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not instance.is_org or not renamed(instance, created, raw, update_fields):
+        return
+    company_name = OrgProfile.objects.filter(user=instance).values_list(
+        'company_name', flat=True).first()
+    suggest_on_commit((ORGANISATION, instance.pk), company_name, instance.username)
+
+
+def touch_events(queryset):
+    """
+    Bumps `updated_at` of the given events, for changes made outside
+    Event.save() that EventDetail shows.
+    """
+    Event.objects.filter(pk__in=list(queryset.values_list('pk', flat=True))).update(
+        updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Event.categories.through)
+def touch_event_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_events(Event.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_events(Event.objects.filter(pk__in=pk_set))
+    else:
+        touch_events(instance.events.all())
+
+
+@receiver(post_save, sender=Category)
+def touch_category_events(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        touch_events(instance.events.all())
+
+
+@receiver(pre_delete, sender=Category)
+def touch_deleted_category_events(sender, instance, **kwargs):
+    touch_events(instance.events.all())
+
+
+@receiver(post_save, sender=get_user_model())
+def touch_renamed_user_rows(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if not renamed(instance, created, raw, update_fields):
+        return
+    touch_events(Event.objects.filter(
+        Q(organiser=instance) | Q(responses__mentor=instance)))
+    Register.objects.filter(mentor=instance).update(updated_at=timezone.now())
+
+
+def bump_on_commit(name):
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+@receiver(post_save, sender=Event)
+@receiver(post_delete, sender=Event)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_events_generation(sender, raw=False, **kwargs):
+    if not raw:
+        bump_on_commit(EVENTS)
+
+
+@receiver(m2m_changed, sender=Event.categories.through)
+def bump_event_categories_generation(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        bump_on_commit(EVENTS)
+
+
+@receiver(post_save, sender=get_user_model())
+def bump_organiser_generation(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Event lists show organiser usernames
+    if not renamed(instance, created, raw, update_fields):
+        return
+    bump_on_commit(EVENTS)
+
+
+@receiver(post_save, sender=Register)
+@receiver(post_delete, sender=Register)
+def bump_registrations_generation(sender, raw=False, **kwargs):
+    if not raw:
+        bump_on_commit(REGISTRATIONS)
+
+
+@receiver(events_created, sender=Event)
+def index_created_events(sender, events, **kwargs):
+    # bulk_create sends no post_save: do what the Event receivers above do
+    reindex_on_commit([event.pk for event in events])
+    opened = [
+        (event.pk, event.latitude, event.longitude, event.event_name)
+        for event in events if event.is_open
+    ]
+
+    def add_to_indexes():
+        for pk, latitude, longitude, event_name in opened:
+            open_events.add(pk, latitude, longitude)
+            suggestions.add((EVENT, pk), (event_name, pk))
+    transaction.on_commit(add_to_indexes)
+    bump_on_commit(EVENTS)
+    refeed_events_on_commit([event.pk for event in events])
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_delete, sender=MentorProfile)
+def refeed_mentor(sender, instance, raw=False, **kwargs):
+    if not raw:
+        refeed_mentors_on_commit([instance.user_id])
+
+
+@receiver(m2m_changed, sender=MentorProfile.skills.through)
+def refeed_mentor_skills(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            refeed_mentors_on_commit([instance.user_id])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        refeed_mentors_on_commit(MentorProfile.objects.filter(
+            pk__in=pk_set).values_list('user_id', flat=True))
+    elif action == 'pre_clear':
+        refeed_mentors_on_commit(instance.mentors.values_list('user_id', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def refeed_deleted_category(sender, instance, **kwargs):
+    # The through rows go without an m2m_changed signal
+    refeed_events_on_commit(instance.events.values_list('pk', flat=True))
+    refeed_mentors_on_commit(instance.mentors.values_list('user_id', flat=True))
+
+
+def index_mentors_on_commit(profile_ids):
+    profile_ids = list(profile_ids)
+    if not profile_ids:
+        return
+
+    def update():
+        found = {}
+        for pk, user_id, latitude, longitude in MentorProfile.objects.filter(
+                pk__in=profile_ids, user__isnull=False).values_list(
+                'pk', 'user_id', 'latitude', 'longitude'):
+            found[pk] = (user_id, latitude, longitude, set())
+        for profile_id, category_id in MentorProfile.skills.through.objects.filter(
+                mentorprofile_id__in=found).values_list('mentorprofile_id', 'category_id'):
+            found[profile_id][3].add(category_id)
+        for pk in profile_ids:
+            if pk in found:
+                mentors.add(pk, *found[pk])
+            else:
+                mentors.remove(pk)
+    transaction.on_commit(update)
+
+
+@receiver(post_save, sender=MentorProfile)
+@receiver(post_delete, sender=MentorProfile)
+def index_mentor(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index_mentors_on_commit([instance.pk])
+
+
+@receiver(m2m_changed, sender=MentorProfile.skills.through)
+def index_mentor_skills(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            index_mentors_on_commit([instance.pk])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        index_mentors_on_commit(pk_set)
+    elif action == 'pre_clear':
+        index_mentors_on_commit(instance.mentors.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Category)
+def index_deleted_category_mentors(sender, instance, **kwargs):
+    index_mentors_on_commit(instance.mentors.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=EventImage)
+def render_event_image(sender, instance, raw=False, **kwargs):
+    if not raw and instance.image and instance.renditions_of != instance.image.name:
+        render_on_commit(instance.pk)
+
+
+@receiver(post_delete, sender=EventImageRendition)
+def delete_rendition_file(sender, instance, **kwargs):
+    delete_file_on_commit(instance.file)
@@ -0,0 +1,140 @@
+"""
+Per-process spatial index of open events.
+
+Coordinates are bucketed into a fixed-size lat/lon grid, so a radius query
+only looks at the cells overlapping the bounding box and then verifies each
+candidate with the exact Great Circle distance. The index is kept up to date
+by the Event signals in events/signals.py; writes made by other processes are
+picked up by a periodic background reload, and callers re-check the returned
+events against the database before using them.
+
+While the index is cold (not loaded yet, or being reloaded for the first
+time) queries return None and callers fall back to the SQL path.
+"""
+from collections import defaultdict
+from math import floor
+
+from django.conf import settings
+
+from .geo import bounding_box, great_circle_distance
+from .memindex import InMemoryIndex
+
+# Half the Earth's circumference: no two points are further apart
+MAX_DISTANCE_KM = 20038
+
+
+class SpatialIndex(InMemoryIndex):
+
+    def __init__(self, cell_size=0.5, ttl=300):
+        super().__init__(ttl)
+        self.cell_size = cell_size
+        self.points = {}
+        self.cells = defaultdict(set)
+
+    def cell(self, latitude, longitude):
+        return (floor(latitude / self.cell_size), floor(longitude / self.cell_size))
+
+    def fetch(self):
+        from .models import Event
+
+        for pk, latitude, longitude in Event.objects.filter(is_open=True).values_list(
+                'id', 'latitude', 'longitude'):
+            yield pk, (float(latitude), float(longitude))
+
+    def _insert(self, pk, point):
+        self.points[pk] = point
+        self.cells[self.cell(*point)].add(pk)
+
+    def _discard(self, pk):
+        point = self.points.pop(pk, None)
+        if point is not None:
+            cell = self.cell(*point)
+            self.cells[cell].discard(pk)
+            if not self.cells[cell]:
+                del self.cells[cell]
+
+    def _get(self, pk):
+        return self.points.get(pk)
+
+    def _clear(self):
+        self.points = {}
+        self.cells = defaultdict(set)
+
+    def add(self, pk, latitude, longitude):
+        super().add(pk, (float(latitude), float(longitude)))
+
+    def _cell_members(self, cells, latitude, longitude, kms):
+        """
+        Yields the keys in the `cells` (a cell -> keys mapping) overlapping
+        the bounding box of the radius. Call with the lock held.
+        """
+        min_lat, max_lat, lon_ranges = bounding_box(latitude, longitude, kms)
+        min_row, max_row = self.cell(min_lat, 0)[0], self.cell(max_lat, 0)[0]
+        for min_lon, max_lon in lon_ranges:
+            min_col, max_col = self.cell(0, min_lon)[1], self.cell(0, max_lon)[1]
+            if (max_row - min_row + 1) * (max_col - min_col + 1) > len(cells):
+                # Sparse index: scanning the occupied cells is cheaper
+                keys = [key for key in cells
+                        if min_row <= key[0] <= max_row and min_col <= key[1] <= max_col]
+            else:
+                keys = [(row, col) for row in range(min_row, max_row + 1)
+                        for col in range(min_col, max_col + 1)]
+            for key in keys:
+                yield from cells.get(key, ())
+
+    def within(self, latitude, longitude, kms, limit=None):
+        """
+        Returns [(distance, pk), ...] for the points within `kms`, closest
+        first, or None if the index is cold.
+        """
+        if not self.ensure_fresh():
+            return None
+        with self.lock:
+            candidates = [(pk, self.points[pk])
+                          for pk in self._cell_members(self.cells, latitude, longitude, kms)]
+
+        ranked = []
+        for pk, (point_lat, point_lon) in candidates:
+            distance = great_circle_distance(latitude, longitude, point_lat, point_lon)
+            if distance <= kms:
+                ranked.append((distance, pk))
+        ranked.sort()
+        return ranked if limit is None else ranked[:limit]
+
+    def nearest(self, latitude, longitude, k):
+        """
+        Returns the k closest points as [(distance, pk), ...], or None if the
+        index is cold. Searches growing radii until k points are found, so
+        the result is exact.
+        """
+        kms = 10
+        while True:
+            ranked = self.within(latitude, longitude, kms)
+            if ranked is None:
+                return None
+            if len(ranked) >= k or kms >= MAX_DISTANCE_KM:
+                return ranked[:k]
+            kms = min(kms * 4, MAX_DISTANCE_KM)
+
+
+def verified_events(queryset, ranked, latitude, longitude, kms=None):
+    """
+    Loads the events for an index result and re-checks them against the
+    database: closed or deleted events are dropped and distances are
+    recomputed from the stored coordinates. Returns them closest first with
+    `distance` set.
+    """
+    events = []
+    for event in queryset.filter(is_open=True, pk__in=[pk for _, pk in ranked]):
+        event.distance = great_circle_distance(
+            latitude, longitude, float(event.latitude), float(event.longitude))
+        if kms is None or event.distance <= kms:
+            events.append(event)
+    events.sort(key=lambda event: (event.distance, event.id))
+    return events
+
+
+open_events = SpatialIndex(
+    cell_size=getattr(settings, 'SPATIAL_INDEX_CELL_DEGREES', 0.5),
+    ttl=getattr(settings, 'SPATIAL_INDEX_TTL', 300),
+)
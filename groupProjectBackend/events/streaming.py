@@ -0,0 +1,86 @@
+"""
+Streaming JSON for unbounded list endpoints.
+
+The queryset is read with `.values()` and `.iterator()` in chunks; each
+chunk goes through the compiled serializer (events/compiled.py, one extra
+query per chunk for many-to-many fields) and is encoded and sent before the
+next one is fetched. The bytes are the same as JSONRenderer's output for
+the whole list, but memory stays bounded by the chunk size and the first
+rows reach the client as soon as the first chunk is fetched.
+"""
+from itertools import islice
+
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+from .compiled import compile_serializer
+from .optimisation import optimise_queryset
+
+CHUNK_SIZE = 1000
+# Bytes of encoded rows sent per write
+BUFFER_SIZE = 64 * 1024
+
+
+def buffered(pieces, size=BUFFER_SIZE):
+    """
+    Joins small strings into chunks of roughly `size` bytes, so the server
+    does not write every row separately.
+    """
+    buffer = []
+    length = 0
+    for piece in pieces:
+        buffer.append(piece)
+        length += len(piece)
+        if length >= size:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            length = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def _encoder():
+    # Mirrors JSONRenderer's defaults so the output is byte for byte the same
+    return JSONEncoder(
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': '),
+    )
+
+
+def iter_json_array(compiled, queryset, chunk_size=CHUNK_SIZE):
+    encode = _encoder().encode
+    rows = compiled.values(queryset).iterator(chunk_size=chunk_size)
+    separator = '['
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        for item in compiled.serialize(chunk):
+            # JSONRenderer escapes these to keep the output valid JavaScript
+            item = encode(item).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+            yield separator + item
+            separator = ','
+    yield '[]' if separator == '[' else ']'
+
+
+def streaming_list_response(request, queryset, serializer_class, model=None):
+    """
+    Returns the serialized `queryset` as a streamed JSON array when the
+    client negotiated JSON, or an ordinary Response otherwise (e.g. the
+    browsable API). `serializer_class` must be compilable.
+    """
+    if not isinstance(request.accepted_renderer, JSONRenderer):
+        queryset = optimise_queryset(queryset, serializer_class)
+        return Response(serializer_class(queryset, many=True).data)
+
+    compiled = compile_serializer(serializer_class, model)
+    response = StreamingHttpResponse(
+        buffered(iter_json_array(compiled, queryset)),
+        content_type='application/json')
+    patch_vary_headers(response, ['Accept'])
+    return response
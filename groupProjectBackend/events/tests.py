@@ -1,3 +1,598 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+from base64 import b64encode
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from users.models import CustomUser, OrgProfile
+from . import renditions, trending
+from .catalog import categories as category_catalog
+from .matching import MentorIndex, suggest_from_database
+from .models import Category, Event, EventImage, Register
+from .renditions import RENDITIONS, render
+from .response_cache import EVENTS, get_generations
+from .search_cache import search_results
+
+
+def create_event(organiser, name='Python meetup', **kwargs):
+    now = timezone.now()
+    return Event.objects.create(
+        event_name=name, event_description='Talks',
+        event_image='https://example.com/event.jpg',
+        event_datetime_start=now, event_datetime_end=now, organiser=organiser, **kwargs)
+
+
+class RenditionMetadataTests(SimpleTestCase):
+
+    def upload(self, mode, image_format):
+        image = Image.new(mode, (800, 600))
+        exif = Image.Exif()
+        exif[0x010f] = 'CameraMaker'
+        exif[0x013b] = 'Uploader Name'
+        output = BytesIO()
+        image.save(output, image_format, exif=exif.tobytes())
+        return Image.open(BytesIO(output.getvalue()))
+
+    def assertNoMetadata(self, content):
+        rendition = Image.open(BytesIO(content))
+        self.assertEqual(dict(rendition.getexif()), {})
+        self.assertNotIn('exif', rendition.info)
+
+    def test_png_renditions_have_no_exif(self):
+        source = self.upload('RGBA', 'PNG')
+        self.assertIn('exif', source.info)
+        for box in RENDITIONS.values():
+            content, extension = render(source, box)
+            self.assertEqual(extension, 'png')
+            self.assertNoMetadata(content)
+
+    def test_jpeg_renditions_have_no_exif(self):
+        source = self.upload('RGB', 'JPEG')
+        for box in RENDITIONS.values():
+            content, extension = render(source, box)
+            self.assertEqual(extension, 'jpg')
+            self.assertNoMetadata(content)
+
+
+class MentorSuggestionTests(TestCase):
+
+    def setUp(self):
+        self.python = Category.objects.create(category='python')
+        self.art = Category.objects.create(category='art')
+        # Profiles keep the default coordinates, so equal skills tie
+        for i in range(40):
+            profile = CustomUser.objects.create(username='mentor%d' % i).mentor_profile
+            profile.skills.add(self.python if i % 2 else self.art)
+        self.index = MentorIndex()
+        self.index.load()
+
+    def assertSamePaths(self, categories, k, exclude_users=()):
+        args = (-31.95351, 115.85705, categories, k, exclude_users)
+        from_index = self.index.suggest(*args)
+        from_database = suggest_from_database(*args)
+        self.assertEqual(len(from_index), min(k, 40 - len(exclude_users)))
+        self.assertEqual(
+            [(round(value, 9), pk) for value, _, pk in from_index],
+            [(round(value, 9), pk) for value, _, pk in from_database],
+        )
+        return from_index
+
+    def test_ties_rank_oldest_profile_first_on_both_paths(self):
+        ranked = self.assertSamePaths([self.python.pk], 10)
+        pks = [pk for _, _, pk in ranked]
+        self.assertEqual(pks, sorted(pks))
+
+    def test_paths_agree_with_mixed_scores(self):
+        self.assertSamePaths([self.python.pk, self.art.pk], 25)
+        self.assertSamePaths([], 5)
+        excluded = set(CustomUser.objects.filter(
+            username__in=['mentor1', 'mentor3']).values_list('pk', flat=True))
+        self.assertSamePaths([self.python.pk], 30, excluded)
+
+
+class CursorValidationTests(TestCase):
+
+    def setUp(self):
+        organiser = CustomUser.objects.create(username='organiser', is_org=True)
+        for i in range(3):
+            create_event(organiser, 'Python meetup %d' % i)
+        self.client = APIClient()
+
+    def cursor(self, position):
+        return b64encode(json.dumps([0, position]).encode('utf-8')).decode('ascii')
+
+    def test_cursor_values_of_the_wrong_type_are_not_found(self):
+        for url in ['/events/', '/events/most-popular/', '/events/search/?query=python']:
+            for position in [['x', 'y'], [{'a': 1}, 1], [None, 1], [1, [2]]]:
+                separator = '&' if '?' in url else '?'
+                response = self.client.get(
+                    url + separator + 'cursor=' + self.cursor(position))
+                self.assertEqual(response.status_code, 404, (url, position))
+
+    def test_valid_cursor_still_pages(self):
+        first = self.client.get('/events/?page_size=2').json()
+        second = self.client.get(first['next']).json()
+        self.assertEqual(len(first['results']) + len(second['results']), 3)
+
+
+class FormatSuffixTests(TestCase):
+
+    def setUp(self):
+        self.organiser = CustomUser.objects.create(username='organiser', is_org=True)
+        self.event = create_event(self.organiser)
+        Category.objects.create(category='python')
+        self.client = APIClient()
+        self.client.force_authenticate(self.organiser)
+
+    def test_msgpack_suffix_on_every_kind_of_view(self):
+        for url in [
+            '/events.msgpack',
+            '/events/%d.msgpack' % self.event.pk,
+            '/events/%d/register.msgpack' % self.event.pk,
+            '/events/%d/images.msgpack' % self.event.pk,
+            '/events/categories.msgpack',
+            '/events/categories/python.msgpack',
+            '/events/categories/python/events.msgpack',
+            '/events/organiser/events-hosted.msgpack',
+            '/users/organiser.msgpack',
+            '/users/org/organiser/profile.msgpack',
+        ]:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertEqual(response['Content-Type'], 'application/msgpack', url)
+
+
+class TrendingScoreTests(TestCase):
+
+    def setUp(self):
+        organiser = CustomUser.objects.create(username='organiser', is_org=True)
+        self.popular = create_event(organiser, 'Popular')
+        self.quiet = create_event(organiser, 'Quiet')
+        for i in range(3):
+            mentor = CustomUser.objects.create(username='mentor%d' % i)
+            Register.objects.create(event=self.popular, mentor=mentor)
+
+    def scores(self):
+        return dict(Event.objects.values_list('event_name', 'trending_score'))
+
+    def test_rebuild_matches_incremental_scores(self):
+        before = self.scores()
+        Event.objects.update(trending_score=123.0)
+        call_command('rebuild_trending_scores', stdout=StringIO())
+        after = self.scores()
+        self.assertAlmostEqual(after['Popular'], before['Popular'])
+        self.assertIsNone(after['Quiet'])
+
+    def test_rebuild_uses_the_current_half_life(self):
+        with mock.patch.object(trending, 'DECAY_RATE', trending.DECAY_RATE / 2):
+            call_command('rebuild_trending_scores', stdout=StringIO())
+            dates = Register.objects.values_list('date_registered', flat=True)
+            expected = trending.score_from_registrations(dates)
+        self.assertAlmostEqual(self.scores()['Popular'], expected)
+
+
+class AttendanceUpdateTests(TestCase):
+
+    def setUp(self):
+        self.event = create_event(CustomUser.objects.create(username='organiser', is_org=True))
+        self.mentor = CustomUser.objects.create(username='mentor')
+        Register.objects.create(event=self.event, mentor=self.mentor)
+        self.url = '/events/%d/attendance/' % self.event.pk
+        self.client = APIClient()
+
+    def test_marks_attendance(self):
+        response = self.client.put(self.url, {
+            'responses': [{'mentor': 'mentor', 'attended': True}],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(Register.objects.get(mentor=self.mentor).attended)
+
+    def test_malformed_bodies_are_bad_requests(self):
+        for body in [[{'mentor': 'mentor', 'attended': True}], 'mentor', {},
+                     {'responses': {'mentor': 'mentor'}}]:
+            response = self.client.put(self.url, body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+        self.assertFalse(Register.objects.get(mentor=self.mentor).attended)
+
+
+class SearchCacheInvalidationTests(TransactionTestCase):
+    # Invalidation runs in on_commit hooks, which TestCase never fires
+
+    def setUp(self):
+        search_results.clear()
+        self.acme = CustomUser.objects.create(username='acme', is_org=True)
+        self.acme.org_profile.company_name = 'Acme Robotics'
+        self.acme.org_profile.save()
+        gardener = CustomUser.objects.create(username='greenthumb', is_org=True)
+        self.python = Category.objects.create(category='python')
+        gardening = Category.objects.create(category='gardening')
+        self.talks = create_event(self.acme, 'Evening talks')
+        self.talks.categories.set([self.python])
+        self.pruning = create_event(gardener, 'Rose pruning')
+        self.pruning.categories.set([gardening])
+        self.client = APIClient()
+
+    def search(self, query):
+        response = self.client.get('/events/search/', {'query': query})
+        return [event['event_name'] for event in response.json()['results']]
+
+    def cached_queries(self):
+        return {' '.join(key[0]) for key in search_results.entries}
+
+    def assertEvicted(self, query, results):
+        self.assertNotIn(query, self.cached_queries())
+        self.assertEqual(self.search(query), results)
+
+    def fill(self, *queries):
+        for query in queries:
+            self.search(query)
+        self.assertEqual(self.cached_queries(), set(queries))
+        # Served from the cache
+        hits = search_results.stats()['hits']
+        self.search(queries[0])
+        self.assertEqual(search_results.stats()['hits'], hits + 1)
+
+    def test_event_rename(self):
+        # 'morning' matches nothing yet: only its term prefix can evict it
+        self.fill('evening', 'morning', 'rose')
+        self.talks.event_name = 'Morning talks'
+        self.talks.save()
+        self.assertEqual(self.cached_queries(), {'rose'})
+        self.assertEvicted('evening', [])
+        self.assertEqual(self.search('morning'), ['Morning talks'])
+
+    def test_event_rename_evicts_pages_showing_it(self):
+        # 'acme' does not share a prefix with the old or new name
+        self.fill('acme', 'rose')
+        self.talks.event_name = 'Morning talks'
+        self.talks.save()
+        self.assertEqual(self.cached_queries(), {'rose'})
+        self.assertEqual(self.search('acme'), ['Morning talks'])
+
+    def test_category_rename(self):
+        self.fill('python', 'rust', 'rose')
+        self.python.category = 'rust'
+        self.python.save()
+        self.assertEqual(self.cached_queries(), {'rose'})
+        self.assertEvicted('python', [])
+        self.assertEqual(self.search('rust'), ['Evening talks'])
+
+    def test_category_delete(self):
+        self.fill('python', 'rose')
+        self.python.delete()
+        self.assertEqual(self.cached_queries(), {'rose'})
+        self.assertEvicted('python', [])
+
+    def test_organisation_rename(self):
+        self.fill('robotics', 'globex', 'rose')
+        self.acme.org_profile.company_name = 'Globex'
+        self.acme.org_profile.save()
+        self.assertEqual(self.cached_queries(), {'rose'})
+        self.assertEvicted('robotics', [])
+        self.assertEqual(self.search('globex'), ['Evening talks'])
+
+    def test_organiser_username_change(self):
+        self.fill('greenthumb', 'bluethumb', 'evening')
+        gardener = CustomUser.objects.get(username='greenthumb')
+        gardener.username = 'bluethumb'
+        gardener.save()
+        self.assertEqual(self.cached_queries(), {'evening'})
+        self.assertEvicted('greenthumb', [])
+        self.assertEqual(self.search('bluethumb'), ['Rose pruning'])
+
+
+class RegistrationCountTests(TestCase):
+
+    def setUp(self):
+        self.event = create_event(CustomUser.objects.create(username='organiser', is_org=True))
+        self.mentors = [CustomUser.objects.create(username='mentor%d' % i) for i in range(3)]
+
+    def count(self):
+        return Event.objects.values_list('registration_count', flat=True).get(pk=self.event.pk)
+
+    def test_register_and_unregister(self):
+        registrations = [
+            Register.objects.create(event=self.event, mentor=mentor) for mentor in self.mentors]
+        self.assertEqual(self.count(), 3)
+        registrations[0].delete()
+        self.assertEqual(self.count(), 2)
+
+    def test_deleted_mentor_registrations_cascade(self):
+        for mentor in self.mentors:
+            Register.objects.create(event=self.event, mentor=mentor)
+        self.mentors[1].delete()
+        self.assertEqual(self.count(), 2)
+        self.assertEqual(Register.objects.filter(event=self.event).count(), 2)
+
+    def test_saving_a_stale_instance_keeps_derived_fields(self):
+        stale = Event.objects.get(pk=self.event.pk)
+        Register.objects.create(event=self.event, mentor=self.mentors[0])
+        trending_score = Event.objects.values_list(
+            'trending_score', flat=True).get(pk=self.event.pk)
+        self.assertIsNotNone(trending_score)
+
+        stale.event_name = 'Renamed'
+        stale.save()
+        event = Event.objects.get(pk=self.event.pk)
+        self.assertEqual(event.event_name, 'Renamed')
+        self.assertEqual(event.registration_count, 1)
+        self.assertEqual(event.trending_score, trending_score)
+
+    def test_reconcile_repairs_drifted_counts(self):
+        Register.objects.create(event=self.event, mentor=self.mentors[0])
+        Event.objects.filter(pk=self.event.pk).update(registration_count=7)
+        out = StringIO()
+        call_command('reconcile_registration_counts', '--dry-run', stdout=out)
+        self.assertIn('Found 1 event(s)', out.getvalue())
+        self.assertEqual(self.count(), 7)
+        call_command('reconcile_registration_counts', stdout=StringIO())
+        self.assertEqual(self.count(), 1)
+
+
+class ResponseCacheTests(TransactionTestCase):
+    # Generations are bumped in on_commit hooks, which TestCase never fires
+
+    def setUp(self):
+        cache.clear()
+        self.organiser = CustomUser.objects.create(username='organiser', is_org=True)
+        self.python = Category.objects.create(category='python')
+        self.event = create_event(self.organiser)
+        self.event.categories.set([self.python])
+        self.client = APIClient()
+
+    def get(self, url, **extra):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def assertRefreshed(self, url, change):
+        first, queries = self.get(url)
+        self.assertGreater(queries, 0)
+        cached, queries = self.get(url)
+        self.assertEqual(queries, 0)
+        self.assertEqual(cached, first)
+        change()
+        refreshed, queries = self.get(url)
+        self.assertGreater(queries, 0)
+        self.assertNotEqual(refreshed, first)
+        return refreshed
+
+    def test_event_create(self):
+        body = self.assertRefreshed(
+            '/events/', lambda: create_event(self.organiser, 'Rust meetup'))
+        self.assertEqual(len(body['results']), 2)
+
+    def test_category_edit(self):
+        def rename():
+            self.python.category = 'rust'
+            self.python.save()
+        body = self.assertRefreshed('/events/', rename)
+        self.assertEqual(body['results'][0]['categories'], ['rust'])
+
+    def test_registration(self):
+        create_event(self.organiser, 'Newer meetup')
+
+        def register():
+            Register.objects.create(
+                event=self.event, mentor=CustomUser.objects.create(username='mentor'))
+        body = self.assertRefreshed('/events/most-popular/short-list/', register)
+        self.assertEqual([event['event_name'] for event in body], ['Python meetup', 'Newer meetup'])
+
+    def test_links_follow_the_request_host(self):
+        for i in range(2):
+            create_event(self.organiser, 'Meetup %d' % i)
+        for host in ['one.example.com', 'two.example.com', 'one.example.com']:
+            body, _ = self.get('/events/?page_size=2', HTTP_HOST=host)
+            self.assertTrue(body['next'].startswith('http://%s/' % host), body['next'])
+
+
+class BulkCreateTests(TestCase):
+
+    def setUp(self):
+        self.organiser = CustomUser.objects.create(username='organiser', is_org=True)
+        for slug in ['python', 'art', 'rust']:
+            Category.objects.create(category=slug)
+        # Rows created before the bulk insert must not be picked up
+        create_event(self.organiser, 'Existing')
+        self.client = APIClient()
+        self.client.force_authenticate(self.organiser)
+
+    def test_ids_and_categories_follow_the_input_order(self):
+        # Several SQLite INSERT batches (at most 999 variables each)
+        slugs = [[], ['python'], ['art', 'rust'], ['python', 'art', 'rust']]
+        now = timezone.now().isoformat()
+        rows = [{
+            'event_name': 'Bulk %03d' % i, 'event_description': 'Talks',
+            'event_image': 'https://example.com/%d.jpg' % i,
+            'event_datetime_start': now, 'event_datetime_end': now,
+            'categories': slugs[i % len(slugs)],
+        } for i in range(150)]
+        response = self.client.post('/events/', rows, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        created = response.json()
+        self.assertEqual([event['event_name'] for event in created],
+                         [row['event_name'] for row in rows])
+        ids = [event['id'] for event in created]
+        self.assertEqual(ids, sorted(ids))
+        for event, row in zip(created, rows):
+            self.assertEqual(sorted(event['categories']), sorted(row['categories']))
+            stored = Event.objects.get(pk=event['id'])
+            self.assertEqual(stored.event_name, row['event_name'])
+            self.assertEqual(
+                sorted(stored.categories.values_list('category', flat=True)),
+                sorted(row['categories']))
+        self.assertEqual(Event.objects.count(), 151)
+
+
+class UnrelatedUserSaveTests(TransactionTestCase):
+    # Re-indexing and generation bumps run in on_commit hooks
+
+    def setUp(self):
+        search_results.clear()
+        self.organiser = CustomUser.objects.create(username='acme', is_org=True)
+        self.event = create_event(self.organiser, 'Evening talks')
+        mentor = CustomUser.objects.create(username='mentor')
+        Register.objects.create(event=self.event, mentor=mentor)
+        APIClient().get('/events/search/', {'query': 'evening'})
+
+    def snapshot(self):
+        return (
+            {' '.join(key[0]) for key in search_results.entries},
+            Event.objects.values_list('updated_at', flat=True).get(pk=self.event.pk),
+            list(Register.objects.values_list('updated_at', flat=True)),
+            get_generations([EVENTS]),
+        )
+
+    def assertUntouched(self, change):
+        before = self.snapshot()
+        self.assertEqual(before[0], {'evening'})
+        change()
+        self.assertEqual(self.snapshot(), before)
+
+    def test_password_change(self):
+        def change_password():
+            user = CustomUser.objects.get(pk=self.organiser.pk)
+            user.set_password('correct horse battery staple')
+            user.save()
+        self.assertUntouched(change_password)
+
+    def test_email_edit(self):
+        def edit_email():
+            user = CustomUser.objects.get(pk=self.organiser.pk)
+            user.email = 'events@acme.example.com'
+            user.save()
+        self.assertUntouched(edit_email)
+
+    def test_mentor_password_change(self):
+        def change_password():
+            user = CustomUser.objects.get(username='mentor')
+            user.set_password('correct horse battery staple')
+            user.save()
+        self.assertUntouched(change_password)
+
+    def test_organisation_logo_change(self):
+        def change_logo():
+            profile = OrgProfile.objects.get(user=self.organiser)
+            profile.org_image = 'https://example.com/logo.png'
+            profile.save()
+        self.assertUntouched(change_logo)
+
+    def test_username_change_still_counts(self):
+        before = self.snapshot()
+        user = CustomUser.objects.get(pk=self.organiser.pk)
+        user.username = 'acme-events'
+        user.save()
+        self.assertEqual(self.snapshot()[0], set())
+        self.assertGreater(
+            Event.objects.values_list('updated_at', flat=True).get(pk=self.event.pk), before[1])
+        self.assertNotEqual(get_generations([EVENTS]), before[3])
+
+
+class RenderMissingRenditionsTests(TransactionTestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        storage = override_settings(
+            MEDIA_ROOT=media_root,
+            DEFAULT_FILE_STORAGE='django.core.files.storage.FileSystemStorage')
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.event = create_event(CustomUser.objects.create(username='organiser', is_org=True))
+
+    def upload(self):
+        output = BytesIO()
+        Image.new('RGB', (800, 600)).save(output, 'JPEG')
+        return ContentFile(output.getvalue(), 'upload.jpg')
+
+    def test_renders_on_commit(self):
+        image = EventImage.objects.create(event=self.event, image=self.upload())
+        image.refresh_from_db()
+        self.assertEqual(image.renditions_of, image.image.name)
+        self.assertEqual(image.renditions.count(), len(RENDITIONS))
+
+    def test_command_renders_images_left_without_renditions(self):
+        with mock.patch('events.signals.render_on_commit'):
+            images = [EventImage.objects.create(event=self.event, image=self.upload())
+                      for _ in range(2)]
+        EventImage.objects.create(event=self.event)
+        self.assertEqual(renditions.missing_renditions().count(), 2)
+
+        out = StringIO()
+        call_command('render_missing_renditions', stdout=out)
+        self.assertIn('Rendered 2 event image(s), 0 failed', out.getvalue())
+        self.assertFalse(renditions.missing_renditions().exists())
+        for image in images:
+            self.assertEqual(image.renditions.count(), len(RENDITIONS))
+
+
+class StaleCategoryCatalogTests(TestCase):
+    # TestCase never runs the on-commit catalog updates, so after a write the
+    # catalog is as stale as another process's would be
+
+    def setUp(self):
+        self.organiser = CustomUser.objects.create(username='organiser', is_org=True)
+        self.python = Category.objects.create(category='python')
+        Category.objects.create(category='art')
+        category_catalog.load()
+        self.addCleanup(category_catalog.load)
+        self.client = APIClient()
+        self.client.force_authenticate(self.organiser)
+
+    def row(self, *slugs):
+        now = timezone.now().isoformat()
+        return {
+            'event_name': 'Meetup', 'event_description': 'Talks',
+            'event_image': 'https://example.com/event.jpg',
+            'event_datetime_start': now, 'event_datetime_end': now,
+            'categories': list(slugs),
+        }
+
+    def test_deleted_category(self):
+        self.python.delete()
+        self.assertIsNotNone(category_catalog.by_slug('python'))
+        response = self.client.post('/events/', self.row('art', 'python'), format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'categories': ['Object with category=python does not exist.']})
+        # Dropped from the catalog
+        self.assertIsNone(category_catalog.by_slug('python'))
+
+    def test_deleted_category_in_bulk(self):
+        self.python.delete()
+        response = self.client.post(
+            '/events/', [self.row('art'), self.row('python')], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), [
+            {}, {'categories': ['Object with category=python does not exist.']}])
+        self.assertFalse(Event.objects.exists())
+
+    def test_renamed_category(self):
+        self.python.category = 'rust'
+        self.python.save()
+        response = self.client.post('/events/', self.row('python'), format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/events/', self.row('rust'), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['categories'], ['rust'])
+
+    def test_slug_moved_to_a_new_category(self):
+        self.python.delete()
+        python = Category.objects.create(category='python')
+        response = self.client.post('/events/', self.row('python'), format='json')
+        self.assertEqual(response.status_code, 201)
+        event = Event.objects.get(pk=response.json()['id'])
+        self.assertEqual(list(event.categories.all()), [python])
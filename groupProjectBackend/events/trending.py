@@ -0,0 +1,101 @@
+"""
+Time-decayed "trending" ranking of events.
+
+Each registration at time t contributes exp(-rate * (now - t)) to an event's
+score. Because every event decays at the same rate, the ranking only depends
+on sum(exp(rate * (t - EPOCH))), which never has to be decayed again. We store
+its logarithm in `Event.trending_score` (log-sum-exp keeps it from
+overflowing), update it incrementally per registration and read the top K
+straight off the (is_open, trending_score, id) index.
+
+Stored scores depend on the half-life (settings.TRENDING_HALF_LIFE_HOURS):
+after changing it, run `manage.py rebuild_trending_scores`, or old and new
+scores are on different scales and the ranking is wrong.
+"""
+import math
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Event, Register
+
+HALF_LIFE = timedelta(hours=getattr(settings, 'TRENDING_HALF_LIFE_HOURS', 72))
+DECAY_RATE = math.log(2) / HALF_LIFE.total_seconds()
+EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+def activity_weight(when):
+    """
+    Log weight of a registration made at `when`.
+    """
+    return DECAY_RATE * (when - EPOCH).total_seconds()
+
+
+def add_log(score, weight):
+    """
+    Returns log(exp(score) + exp(weight)) without overflowing.
+    """
+    if score is None:
+        return weight
+    high, low = max(score, weight), min(score, weight)
+    return high + math.log1p(math.exp(low - high))
+
+
+def score_from_registrations(dates):
+    score = None
+    for date_registered in dates:
+        score = add_log(score, activity_weight(date_registered))
+    return score
+
+
+def decayed_score(score, now=None):
+    """
+    Converts a stored log score into the decayed registration count at `now`.
+    """
+    if score is None:
+        return 0.0
+    return math.exp(score - activity_weight(now or timezone.now()))
+
+
+def record_registration(event_id, date_registered):
+    with transaction.atomic():
+        score = Event.objects.select_for_update().filter(pk=event_id).values_list(
+            'trending_score', flat=True).first()
+        Event.objects.filter(pk=event_id).update(
+            trending_score=add_log(score, activity_weight(date_registered)))
+
+
+def recompute_event(event_id):
+    """
+    Rebuilds one event's score from its registrations (used after deletes,
+    where subtracting in log space would lose precision).
+    """
+    dates = Register.objects.filter(event_id=event_id).values_list(
+        'date_registered', flat=True)
+    Event.objects.filter(pk=event_id).update(
+        trending_score=score_from_registrations(dates))
+
+
+def rebuild_all(batch_size=1000):
+    """
+    Recomputes the score of every event from its registrations. Returns the
+    number of events with a score.
+    """
+    scores = {}
+    with transaction.atomic():
+        for event_id, date_registered in Register.objects.order_by().values_list(
+                'event_id', 'date_registered').iterator():
+            scores[event_id] = add_log(scores.get(event_id), activity_weight(date_registered))
+        Event.objects.update(trending_score=None)
+        Event.objects.bulk_update(
+            [Event(pk=pk, trending_score=score) for pk, score in scores.items()],
+            ['trending_score'], batch_size=batch_size)
+    return len(scores)
+
+
+def top_events(limit):
+    return Event.objects.filter(
+        is_open=True, trending_score__isnull=False
+    ).order_by('-trending_score', '-id')[:limit]
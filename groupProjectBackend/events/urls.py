@@ -5,12 +5,23 @@ from . import views
 urlpatterns = [
     path('events/', views.EventList.as_view()),
     path('events/search/', views.EventSearchView.as_view()),
+    path('events/search/cache-stats/', views.SearchCacheStatsView.as_view()),
+    path('events/autocomplete/', views.AutocompleteView.as_view()),
     path('events/most-popular/', views.PopularEventsList.as_view()),
     path('events/most-popular/short-list/',
          views.PopularEventsShortList.as_view()),
+    path('events/trending/', views.TrendingEventsList.as_view()),
+    path('events/for-me/', views.MentorFeedView.as_view()),
     path('events/location/<int:kms>/', views.LocationEventsList.as_view()),
+    path('events/location/nearest/', views.NearestEventsList.as_view()),
+    path('events/upcoming/', views.UpcomingEventsList.as_view()),
+    path('events/series/', views.EventSeriesList.as_view()),
+    path('events/series/<int:pk>/', views.EventSeriesDetail.as_view()),
+    path('events/series/<int:pk>/occurrences/<int:index>/register/',
+         views.SeriesOccurrenceRegister.as_view()),
     path('events/<int:pk>/responses/', views.MentorAttendanceView.as_view()),
-    path('events/<int:pk>/register/', views.MentorsRegisterList.as_view()),
+    path('events/<int:pk>/register/', views.MentorsRegisterList.as_view(),
+         name='event-registrations'),
     # adding new url to allow org to mark attendane
 
     path('events/<int:pk>/', views.EventDetail.as_view()),
@@ -18,6 +29,9 @@ urlpatterns = [
     path('events/<int:event_pk>/images/<int:image_pk>/',
          views.EventImageDetail.as_view()),
     path('events/<int:pk>/attendance/', views.EventAttendenceView.as_view()),
+    path('events/<int:pk>/roster/', views.EventRosterExport.as_view()),
+    path('events/<int:pk>/suggested-mentors/',
+         views.SuggestedMentorsList.as_view()),
     path('events/categories/', views.CategoryList.as_view()),
     path('events/categories/<str:category>/', views.CategoryDetail.as_view()),
     path('events/categories/<str:category>/events/',
@@ -28,6 +42,8 @@ urlpatterns = [
          views.MentorAttendanceView.as_view()),
     path('events/<str:username>/events-hosted/',
          views.EventHostedView.as_view()),
+    path('events/<str:username>/roster/',
+         views.OrganiserRosterExport.as_view()),
     # may need debugging?
     path('events/<int:pk>/responses/<str:username>/',
          views.MentorsRegisterDetailView.as_view()),
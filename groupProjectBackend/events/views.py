@@ -1,19 +1,40 @@
 from django.core.exceptions import RequestDataTooBig
 from django.shortcuts import render
-from django.db.models import Count, Q
+from django.db import connection, transaction
+from django.db.models import Max
 from django.http import Http404
 from rest_framework import status, permissions, generics, filters
 from rest_framework.views import APIView
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.parsers import FileUploadParser, MultiPartParser
 from rest_framework.response import Response
-from .models import Event, Category, Register, EventImage
-from .serializers import BulkAttendanceUpdateSerializer, EventSerializer, EventDetailSerializer, CategoryProjectSerializer, CategorySerializer, MentorEventAttendanceSerializer, RegisterSerializer, MentorCategory, EventImageSerializer
+from .models import Event, EventSeries, Category, Register, EventImage
+from .serializers import AttendanceUpdateSerializer, BulkAttendanceUpdateSerializer, EventSerializer, EventDistanceSerializer, EventSeriesSerializer, OccurrenceSerializer, WindowQuerySerializer, LocationQuerySerializer, EventDetailSerializer, CategoryProjectSerializer, CategorySerializer, MentorEventAttendanceSerializer, RegisterSerializer, MentorCategory, EventImageSerializer, RegisterMentorSerializer, SuggestedMentorSerializer
 from .permissions import IsOwnerOrReadOnly, IsSuperUser, IsOrganisationOrReadOnly, HasNotRegistered, IsOrganiserOrReadOnly
+from .pagination import FeedPagination, NewestEventsPagination, PopularEventsPagination, RegistrationsPagination, SearchRankPagination
+from .optimisation import OptimisedQuerysetMixin, optimise_queryset
+from .fieldsets import requested_fields
+from .compiled import CompiledListMixin, compile_serializer
+from .conditional import conditional_get
+from .response_cache import EVENTS, REGISTRATIONS, cache_anonymous_response
+from .trending import top_events
+from .geo import nearest, within_distance
+from .spatial import open_events, verified_events
+from .attendance import update_attendance
+from .export import event_roster, organiser_roster, roster_response
+from .renderers import CSVRenderer, NDJSONRenderer
+from .streaming import streaming_list_response
+from .search import INDEXED_VENDORS, query_terms, search_events
+from .search_cache import search_results
+from .autocomplete import fallback_complete, suggestions
+from .catalog import categories as category_catalog
+from .recurrence import is_occurrence, materialise, window_events
+from .matching import mentors as mentor_index, suggest_from_database
 from users.models import CustomUser, MentorProfile
+from users.coordinates import get_user_coordinates
 from math import radians, cos, sin, asin, sqrt
 from itertools import chain
 from django.db.models import F, Func
-from django.db.models.functions import Sin, Cos, Sqrt, ASin, Radians, ATan2
 
 
 class CategoryList(APIView):
@@ -22,12 +43,11 @@ class CategoryList(APIView):
     """
     permission_classes = [IsSuperUser, ]
 
-    def get(self, request):
-        categories = Category.objects.all()
-        serializer = CategorySerializer(categories, many=True)
+    def get(self, request, format=None):
+        serializer = CategorySerializer(category_catalog.all(), many=True)
         return Response(serializer.data)
 
-    def post(self, request):
+    def post(self, request, format=None):
         self.check_permissions(request)
         serializer = CategorySerializer(data=request.data)
 
@@ -56,12 +76,14 @@ class CategoryDetail(APIView):
         except Category.DoesNotExist:
             raise Http404
 
-    def get(self, request, category):
-        category_object = self.get_object(category)
+    def get(self, request, category, format=None):
+        category_object = category_catalog.by_slug(category)
+        if category_object is None:
+            raise Http404
         serializer = CategorySerializer(category_object)
         return Response(serializer.data)
 
-    def put(self, request, category):
+    def put(self, request, category, format=None):
         category_object = self.get_object(category)
         self.check_object_permissions(request, category_object)
         data = request.data
@@ -81,7 +103,7 @@ class CategoryDetail(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def delete(self, request, category):
+    def delete(self, request, category, format=None):
         category_object = self.get_object(category)
         self.check_object_permissions(request, category_object)
 
@@ -92,18 +114,27 @@ class CategoryDetail(APIView):
             raise Http404
 
 
-class EventList(APIView):
+class EventList(CompiledListMixin, OptimisedQuerysetMixin, generics.ListAPIView):
     """
-    Returns list of all open events
+    Returns list of all open events, newest first (cursor paginated)
+    Posts an event, or a list of events to create them all at once
     """
     permission_classes = [IsOrganisationOrReadOnly]
+    serializer_class = EventSerializer
+    pagination_class = NewestEventsPagination
+    compiled_model = Event
+    max_bulk_events = 10000
 
-    def get(self, request):
-        events = Event.objects.filter(is_open=True)[:30]
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data)
+    def get_queryset(self):
+        return Event.objects.filter(is_open=True)
 
-    def post(self, request):
+    @cache_anonymous_response(EVENTS)
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def post(self, request, format=None):
+        if isinstance(request.data, list):
+            return self.bulk_create(request)
         serializer = EventSerializer(data=request.data)
         if serializer.is_valid():
             serializer.save(organiser=request.user)
@@ -117,30 +148,100 @@ class EventList(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
+    def bulk_create(self, request):
+        # Errors are reported per row: a list aligned with the posted one
+        if len(request.data) > self.max_bulk_events:
+            raise ValidationError({'non_field_errors': [
+                'Post at most %d events at once.' % self.max_bulk_events]})
+        serializer = EventSerializer(data=request.data, many=True)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        events = serializer.save(organiser=request.user)
+        compiled = compile_serializer(EventSerializer, Event)
+        created = Event.objects.filter(pk__in=[event.pk for event in events]).order_by('pk')
+        return Response(
+            compiled.serialize(compiled.values(created)),
+            status=status.HTTP_201_CREATED
+        )
+
 
-class EventSearchView(generics.ListAPIView):
+class EventSearchView(OptimisedQuerysetMixin, generics.ListAPIView):
     """
-    Filters all events using search parameters
+    Full-text search over events, best matches first (cursor paginated)
+    Pass the search words as ?query=
     """
     serializer_class = EventSerializer
+    pagination_class = SearchRankPagination
 
     def get_queryset(self):
-        query = self.request.query_params['query']
-        queryset = Event.objects.filter(Q(event_name__icontains=query) | Q(event_description__icontains=query) | Q(event_location__icontains=query) | Q(
-            categories__category__icontains=query) | Q(organiser__username__icontains=query) | Q(organiser__org_profile__company_name__icontains=query)).order_by('-date_created').distinct()[:30]
-        return queryset
+        return search_events(self.request.query_params.get('query', ''))
+
+    def list(self, request, *args, **kwargs):
+        if connection.vendor not in INDEXED_VENDORS:
+            return super().list(request, *args, **kwargs)
+        paginator = self.paginator
+        key = search_results.make_key(
+            query_terms(request.query_params.get('query', '')),
+            request.query_params.get(paginator.cursor_query_param),
+            paginator.get_page_size(request),
+            requested_fields(self.get_serializer_class(), request),
+        )
+        cached = search_results.get(key)
+        if cached is not None:
+            return paginator.get_cached_response(request, *cached)
+
+        generation = search_results.generation
+        response = super().list(request, *args, **kwargs)
+        search_results.set(
+            key,
+            (paginator.get_next_cursor(), paginator.get_previous_cursor(), response.data['results']),
+            [event.pk for event in paginator.page],
+            generation,
+        )
+        return response
 
 
-class PopularEventsList(APIView):
+class SearchCacheStatsView(APIView):
     """
-    Returns list of projects from most responses to least
+    Returns the hit/miss counters of this process's search result cache (admins only)
     """
+    permission_classes = [permissions.IsAdminUser]
 
-    def get(self, request):
-        events = Event.objects.annotate(num_responses=Count(
-            'responses')).order_by('-num_responses')[:30]
-        serializer = EventSerializer(events, many=True)
-        return Response(serializer.data)
+    def get(self, request, format=None):
+        return Response(search_results.stats())
+
+
+class AutocompleteView(APIView):
+    """
+    Suggests open events, categories and organisations as the user types,
+    tolerating small typos. Pass the partial text as ?q=
+    Pass ?limit= to change the number of suggestions (max 20)
+    """
+    default_limit = 10
+    max_limit = 20
+
+    def get(self, request, format=None):
+        try:
+            limit = max(min(int(request.query_params['limit']), self.max_limit), 1)
+        except (KeyError, ValueError):
+            limit = self.default_limit
+        query = request.query_params.get('q', '')
+        results = suggestions.complete(query, limit)
+        if results is None:
+            results = fallback_complete(query, limit)
+        return Response(results)
+
+
+class PopularEventsList(CompiledListMixin, OptimisedQuerysetMixin, generics.ListAPIView):
+    """
+    Returns list of projects from most responses to least (cursor paginated)
+    """
+    serializer_class = EventSerializer
+    pagination_class = PopularEventsPagination
+    compiled_model = Event
+
+    def get_queryset(self):
+        return Event.objects.all()
 
 
 class PopularEventsShortList(APIView):
@@ -148,86 +249,207 @@ class PopularEventsShortList(APIView):
 Returns shortlist (6) of projects from most responses to least
     """
 
-    def get(self, request):
-        events = Event.objects.annotate(num_responses=Count(
-            'responses')).order_by('-num_responses')[:6]
-        serializer = EventSerializer(events, many=True)
+    @cache_anonymous_response(EVENTS, REGISTRATIONS)
+    def get(self, request, format=None):
+        fields = requested_fields(EventSerializer, request)
+        events = Event.objects.order_by('-registration_count', '-id')[:6]
+        events = optimise_queryset(events, EventSerializer, fields)
+        serializer = EventSerializer(events, many=True, fields=fields)
         return Response(serializer.data)
 
 
-class LocationEventsList(APIView):
+class MentorFeedView(CompiledListMixin, OptimisedQuerysetMixin, generics.ListAPIView):
     """
-    Returns list of events within a specifed distance of a logged-in user (closest to furthest)
-    Pass the kms into the url
+    Returns the open events picked for the logged in mentor from their skills
+    and location, best first (cursor paginated). Events they have registered
+    for are left out.
     """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = EventSerializer
+    pagination_class = FeedPagination
+    compiled_model = Event
+
+    def get_queryset(self):
+        user = self.request.user
+        return Event.objects.filter(
+            feed_entries__mentor=user, is_open=True
+        ).annotate(
+            feed_score=F('feed_entries__score')
+        ).exclude(responses__mentor=user)
 
-    def get(self, request, kms):
-        # Get user coordinates
-        profile = MentorProfile.objects.get(user=request.user)
-        latitude = float(profile.latitude)
-        longitude = float(profile.longitude)
-        radius = 6378.137  # this is in kms
 
-        # Filter events by distance from user location using Great Circle formula
-        events = Event.objects.annotate(distance=(
-            radius * (2 * ATan2(Sqrt(Sin((Radians(F('latitude')) - Radians(latitude))/2) ** 2 + Cos(Radians(latitude)) * Cos(Radians(F('latitude'))) * Sin((Radians(F('longitude')) - Radians(longitude))/2)**2),
-                                Sqrt(1 - (Sin((Radians(F('latitude')) - Radians(latitude))/2) ** 2 + Cos(Radians(latitude)) * Cos(Radians(F('latitude'))) * Sin((Radians(F('longitude')) - Radians(longitude))/2)**2))))
-        )).filter(distance__lte=kms).order_by('distance')[:30]
+class TrendingEventsList(APIView):
+    """
+    Returns the open events with the most recent registration activity.
+    Pass ?limit= to change the size of the list (max 50)
+    """
+    default_limit = 10
+    max_limit = 50
 
-        for event in events:
-            print("EVENT DISTANCE", event.distance)
-        serializer = EventSerializer(events, many=True)
+    def get(self, request, format=None):
+        try:
+            limit = min(int(request.query_params['limit']), self.max_limit)
+        except (KeyError, ValueError):
+            limit = self.default_limit
+        fields = requested_fields(EventSerializer, request)
+        events = optimise_queryset(top_events(max(limit, 0)), EventSerializer, fields)
+        serializer = EventSerializer(events, many=True, fields=fields)
         return Response(serializer.data)
 
 
-class CategoryProjectList(APIView):
+class LocationQueryMixin:
+    """
+    Resolves the origin of a location search: ?lat=&lon= if given, otherwise
+    the (cached) coordinates of the logged-in mentor's profile.
+    """
+    # Read by the spatial index check even if ?fields= leaves them out
+    coordinate_fields = ('latitude', 'longitude')
+
+    def get_location_query(self, request):
+        query = LocationQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        if 'lat' not in params:
+            coordinates = get_user_coordinates(request.user)
+            if coordinates is None:
+                raise ValidationError({'lat': [
+                    'Pass lat and lon, or log in with a mentor profile.']})
+            params['lat'], params['lon'] = coordinates
+        return params
+
+    def filter_events(self, queryset, params):
+        if 'category' in params:
+            queryset = queryset.filter(categories__category=params['category'])
+        if 'start_after' in params:
+            queryset = queryset.filter(event_datetime_start__gte=params['start_after'])
+        if 'start_before' in params:
+            queryset = queryset.filter(event_datetime_start__lte=params['start_before'])
+        return queryset
+
+
+class LocationEventsList(LocationQueryMixin, APIView):
+    """
+    Returns list of open events within a specifed distance (closest to furthest)
+    Pass the kms into the url, and optionally ?lat=&lon= (defaults to the
+    logged-in mentor's location), ?category=, ?start_after=, ?start_before=
+    and ?sort=date
+    """
+
+    def get(self, request, kms, format=None):
+        params = self.get_location_query(request)
+        latitude, longitude = params['lat'], params['lon']
+        fields = requested_fields(EventDistanceSerializer, request)
+        queryset = optimise_queryset(
+            Event.objects.all(), EventDistanceSerializer, fields, keep=self.coordinate_fields)
+        filtered = self.filter_events(queryset, params)
+
+        ranked = None
+        if filtered is queryset and params['sort'] == 'distance':
+            ranked = open_events.within(latitude, longitude, kms, limit=30)
+        if ranked is not None:
+            events = verified_events(queryset, ranked, latitude, longitude, kms)
+        else:
+            # Filtered, date sorted or index still warming up: one query with
+            # a bounding box on the indexed coordinates, then exact distance
+            events = within_distance(
+                filtered.filter(is_open=True), latitude, longitude, kms)
+            if params['sort'] == 'date':
+                events = events.order_by('event_datetime_start', 'distance', 'id')
+            events = events[:30]
+        serializer = EventDistanceSerializer(events, many=True, fields=fields)
+        return Response(serializer.data)
+
+
+class NearestEventsList(LocationQueryMixin, APIView):
     """
-    Returns list of projects of specified category
+    Returns the k open events closest to ?lat=&lon= (defaults to the
+    logged-in mentor's location), closest to furthest
+    Pass ?k= to change the number of events (max 50)
     """
+    default_k = 10
+    max_k = 50
 
-    def get(self, request, category):
-        events = Event.objects.filter(categories__category=category)[:30]
-        serializer = EventSerializer(events, many=True)
+    def get(self, request, format=None):
+        try:
+            k = max(min(int(request.query_params['k']), self.max_k), 1)
+        except (KeyError, ValueError):
+            k = self.default_k
+        params = self.get_location_query(request)
+        latitude, longitude = params['lat'], params['lon']
+        fields = requested_fields(EventDistanceSerializer, request)
+        queryset = optimise_queryset(
+            Event.objects.all(), EventDistanceSerializer, fields, keep=self.coordinate_fields)
+
+        ranked = open_events.nearest(latitude, longitude, k)
+        if ranked is not None:
+            events = verified_events(queryset, ranked, latitude, longitude)
+        else:
+            events = nearest(queryset.filter(is_open=True), latitude, longitude, k)
+        serializer = EventDistanceSerializer(events, many=True, fields=fields)
         return Response(serializer.data)
 
 
+class CategoryProjectList(CompiledListMixin, OptimisedQuerysetMixin, generics.ListAPIView):
+    """
+    Returns list of projects of specified category (cursor paginated)
+    """
+    serializer_class = EventSerializer
+    pagination_class = NewestEventsPagination
+    compiled_model = Event
+
+    def get_queryset(self):
+        return Event.objects.filter(categories__category=self.kwargs['category'])
+
+
 class CategoryProjectShortList(APIView):
     """
     Returns shortlist (6) of projects of specified category
     """
 
-    def get(self, request, category):
+    @cache_anonymous_response(EVENTS)
+    def get(self, request, category, format=None):
+        fields = requested_fields(EventSerializer, request)
         events = Event.objects.filter(categories__category=category)[:6]
-        serializer = EventSerializer(events, many=True)
+        events = optimise_queryset(events, EventSerializer, fields)
+        serializer = EventSerializer(events, many=True, fields=fields)
         return Response(serializer.data)
 
 
 class EventDetail(APIView):
     """
     Returns details of specified event
+    Pass ?fields= and/or ?expand= to choose the fields returned
     """
     permission_classes = [IsOwnerOrReadOnly, ]
     serializer_class = EventDetailSerializer
 
-    def get_object(self, pk):
+    def get_object(self, pk, fields=None):
         try:
-            return Event.objects.get(pk=pk)
+            events = optimise_queryset(Event.objects.all(), EventDetailSerializer, fields)
+            return events.get(pk=pk)
         except Event.DoesNotExist:
             raise Http404
 
-    def get(self, request, pk):
-        event = self.get_object(pk)
-        serializer = EventDetailSerializer(event)
+    def get_version(self, request, pk, format=None):
+        return Event.objects.filter(pk=pk).values_list('updated_at', flat=True).first()
+
+    @conditional_get
+    def get(self, request, pk, format=None):
+        fields = requested_fields(EventDetailSerializer, request)
+        event = self.get_object(pk, fields)
+        serializer = EventDetailSerializer(
+            event, fields=fields, context={'request': request})
         return Response(serializer.data)
 
-    def put(self, request, pk):
+    def put(self, request, pk, format=None):
         event = self.get_object(pk)
         self.check_object_permissions(request, event)
         data = request.data
         serializer = EventDetailSerializer(
             instance=event,
             data=data,
-            partial=True
+            partial=True,
+            context={'request': request}
         )
         if serializer.is_valid():
             serializer.save()
@@ -240,7 +462,7 @@ class EventDetail(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def delete(self, request, pk):
+    def delete(self, request, pk, format=None):
         event = self.get_object(pk)
         self.check_object_permissions(request, event)
 
@@ -267,12 +489,13 @@ class EventImageList(APIView):
         except Event.DoesNotExist:
             raise Http404
 
-    def get(self, request, pk):
-        images = EventImage.objects.all().filter(event=self.get_object(pk))
+    def get(self, request, pk, format=None):
+        images = EventImage.objects.all().filter(
+            event=self.get_object(pk)).prefetch_related('renditions')
         serializer = EventImageSerializer(images, many=True)
         return Response(serializer.data)
 
-    def post(self, request, pk):
+    def post(self, request, pk, format=None):
         print("REQUEST DATA:", request.data)
         serializer = EventImageSerializer(data={'image': request.data['file']})
         if serializer.is_valid():
@@ -302,12 +525,12 @@ class EventImageDetail(APIView):
         except EventImage.DoesNotExist:
             raise Http404
 
-    def get(self, request, event_pk, image_pk):
+    def get(self, request, event_pk, image_pk, format=None):
         image = self.get_object(image_pk)
         serializer = EventImageSerializer(image)
         return Response(serializer.data)
 
-    def put(self, request, event_pk, image_pk):
+    def put(self, request, event_pk, image_pk, format=None):
         image = self.get_object(image_pk)
         serializer = EventImageSerializer(
             image, data={'image': request.data['file']})
@@ -322,15 +545,111 @@ class EventImageDetail(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def delete(self, request, event_pk, image_pk):
+    def delete(self, request, event_pk, image_pk, format=None):
         image = self.get_object(image_pk)
         image.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class UpcomingEventsList(APIView):
+    """
+    Returns the open events starting in a date window, earliest first,
+    including the occurrences of recurring event series (those not yet
+    registered for have a null id)
+    Pass ?start_after= (default now) and ?start_before= (default 30 days
+    later), and optionally ?category= and ?limit= (default 50, max 200)
+    """
+
+    def get(self, request, format=None):
+        query = WindowQuerySerializer(data=request.query_params)
+        query.is_valid(raise_exception=True)
+        params = query.validated_data
+        fields = requested_fields(OccurrenceSerializer, request)
+        events = optimise_queryset(
+            Event.objects.all(), OccurrenceSerializer, fields,
+            keep=['event_datetime_start'])
+        series = EventSeries.objects.all()
+        if 'category' in params:
+            events = events.filter(categories__category=params['category'])
+            series = series.filter(categories__category=params['category'])
+        results = window_events(
+            events, series, params['start_after'], params['start_before'], params['limit'])
+        serializer = OccurrenceSerializer(results, many=True, fields=fields)
+        return Response(serializer.data)
+
+
+class EventSeriesList(generics.ListAPIView):
+    """
+    Returns list of all open recurring event series, newest first (cursor
+    paginated)
+    Posts a new series
+    """
+    permission_classes = [IsOrganisationOrReadOnly]
+    serializer_class = EventSeriesSerializer
+    pagination_class = NewestEventsPagination
+
+    def get_queryset(self):
+        return EventSeries.objects.filter(is_open=True).select_related(
+            'organiser').prefetch_related('categories')
+
+    def post(self, request, format=None):
+        serializer = EventSeriesSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save(organiser=request.user)
+            return Response(
+                serializer.data,
+                status=status.HTTP_201_CREATED
+            )
+        return Response(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+class EventSeriesDetail(APIView):
+    """
+    Returns details of specified recurring event series
+    """
+
+    def get(self, request, pk, format=None):
+        try:
+            series = EventSeries.objects.select_related('organiser').get(pk=pk)
+        except EventSeries.DoesNotExist:
+            raise Http404
+        serializer = EventSeriesSerializer(series)
+        return Response(serializer.data)
+
+
+class SeriesOccurrenceRegister(APIView):
+    """
+    Registers the logged-in mentor for an occurrence of a series, creating
+    the occurrence's event the first time
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, pk, index, format=None):
+        try:
+            series = EventSeries.objects.get(pk=pk, is_open=True)
+        except EventSeries.DoesNotExist:
+            raise Http404
+        if not is_occurrence(series, index):
+            raise Http404
+        if request.user.is_org:
+            raise PermissionDenied()
+        serializer = RegisterSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        with transaction.atomic():
+            event = materialise(series, index)
+            if not event.is_open or Register.objects.filter(event=event, mentor=request.user).exists():
+                raise PermissionDenied()
+            serializer.save(event=event, mentor=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
 class MentorsRegisterList(APIView):
     """
-    Returns a list of mentors for specified event
+    Returns a list of mentors for specified event, in registration order
+    (cursor paginated)
     Posts a mentor register object
     """
     permission_classes = [HasNotRegistered, ]
@@ -341,12 +660,23 @@ class MentorsRegisterList(APIView):
         except Event.DoesNotExist:
             raise Http404
 
-    def get(self, request, pk):
+    def get_version(self, request, pk, format=None):
+        version = Event.objects.filter(pk=pk).annotate(
+            responses_updated_at=Max('responses__updated_at')
+        ).values_list('updated_at', 'responses_updated_at').first()
+        if version is None:
+            return None
+        return max(filter(None, version))
+
+    @conditional_get
+    def get(self, request, pk, format=None):
         responses = Register.objects.all().filter(event=self.get_object(pk))
-        serializer = RegisterSerializer(responses, many=True)
-        return Response(serializer.data)
+        compiled = compile_serializer(RegisterSerializer, Register)
+        paginator = RegistrationsPagination()
+        page = paginator.paginate_queryset(compiled.values(responses), request, self)
+        return paginator.get_paginated_response(compiled.serialize(page))
 
-    def post(self, request, pk):
+    def post(self, request, pk, format=None):
         self.check_object_permissions(request, pk)
         serializer = RegisterSerializer(data=request.data)
 
@@ -361,7 +691,7 @@ class MentorsRegisterList(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def delete(self, request, pk):
+    def delete(self, request, pk, format=None):
         event_registrations = Register.objects.all().filter(event=self.get_object(pk))
         user_registration = event_registrations.filter(mentor=request.user)
         if len(user_registration) > 0:
@@ -393,26 +723,108 @@ class MentorAttendanceView(APIView):
         except CustomUser.DoesNotExist:
             raise Http404
 
-    def get(self, request, username):
+    def get(self, request, username, format=None):
         mentor = self.get_object(username=username)
         attended = Register.objects.all().filter(mentor=mentor)
-        serializer = MentorCategory(attended, many=True)
-        return Response(serializer.data)
+        return streaming_list_response(request, attended, MentorCategory, Register)
 
 
-class EventHostedView(APIView):
+class EventHostedView(OptimisedQuerysetMixin, generics.ListAPIView):
     """
     This returns a list of all events (open and closed) by an organiser
+    (cursor paginated)
     """
+    serializer_class = EventSerializer
+    pagination_class = NewestEventsPagination
+
+    def get_queryset(self):
+        return Event.objects.filter(organiser__username=self.kwargs['username'])
+
 
-    def get(self, request, username):
-        organiser = CustomUser.objects.get(username=username)
-        hosted = Event.objects.all().filter(organiser=organiser)
-        serializer = EventSerializer(hosted, many=True)
+class SuggestedMentorsList(APIView):
+    """
+    Returns the mentors best matching an event by skills and distance, best
+    first, leaving out the ones already registered. Only for the event's
+    organiser
+    Pass ?k= to change the number of mentors (max 100)
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    default_k = 50
+    max_k = 100
 
+    def get(self, request, pk, format=None):
+        try:
+            event = Event.objects.get(pk=pk)
+        except Event.DoesNotExist:
+            raise Http404
+        if event.organiser_id != request.user.pk and not request.user.is_superuser:
+            raise PermissionDenied
+        try:
+            k = max(min(int(request.query_params['k']), self.max_k), 1)
+        except (KeyError, ValueError):
+            k = self.default_k
+
+        latitude, longitude = float(event.latitude), float(event.longitude)
+        categories = list(event.categories.values_list('pk', flat=True))
+        registered = set(Register.objects.filter(event=event).values_list('mentor_id', flat=True))
+        ranked = mentor_index.suggest(latitude, longitude, categories, k, registered)
+        if ranked is None:
+            ranked = suggest_from_database(latitude, longitude, categories, k, registered)
+
+        profiles = MentorProfile.objects.filter(
+            pk__in=[profile_id for _, _, profile_id in ranked]
+        ).select_related('user').prefetch_related('skills').in_bulk()
+        suggested = []
+        for value, distance, profile_id in ranked:
+            profile = profiles.get(profile_id)
+            if profile is not None:
+                profile.match, profile.distance = value, distance
+                suggested.append(profile)
+        serializer = SuggestedMentorSerializer(suggested, many=True)
         return Response(serializer.data)
 
 
+class EventRosterExport(APIView):
+    """
+    Streams the registrations of an event, with mentor profile fields and
+    attendance, as CSV (default) or NDJSON (roster.ndjson or
+    Accept: application/x-ndjson). Only for the event's organiser
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+
+    def get(self, request, pk, format=None):
+        try:
+            event = Event.objects.get(pk=pk)
+        except Event.DoesNotExist:
+            raise Http404
+        if event.organiser_id != request.user.pk and not request.user.is_superuser:
+            raise PermissionDenied
+        return roster_response(
+            event_roster(event), request.accepted_renderer.format,
+            'event-%d-roster' % event.pk)
+
+
+class OrganiserRosterExport(APIView):
+    """
+    Streams the registrations of all events hosted by an organiser, like
+    EventRosterExport. Only for the organiser themselves
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+
+    def get(self, request, username, format=None):
+        try:
+            organiser = CustomUser.objects.get(username=username)
+        except CustomUser.DoesNotExist:
+            raise Http404
+        if organiser.pk != request.user.pk and not request.user.is_superuser:
+            raise PermissionDenied
+        return roster_response(
+            organiser_roster(organiser), request.accepted_renderer.format,
+            '%s-roster' % organiser.username)
+
+
 class EventAttendenceView(APIView):
     """
     Returns a view of all mentors registered for an event.
@@ -422,15 +834,32 @@ class EventAttendenceView(APIView):
     # permission_classes = [IsOrganiserOrReadOnly, ]
     serializer = BulkAttendanceUpdateSerializer
 
-    def get(self, request, pk):
-        serializer = self.serializer(instance=Event.objects.get(pk=pk))
-        return Response(serializer.data)
+    def get_object(self, pk):
+        try:
+            return Event.objects.get(pk=pk)
+        except Event.DoesNotExist:
+            raise Http404
 
-    def put(self, request, pk):
-        event = Event.objects.get(pk=pk)
-        serializer = self.serializer(instance=event)
-        for thing in event.responses.all():
-            userPayload = [mentor for mentor in request.data["responses"] if mentor["mentor"] == str(thing.mentor)]
-            thing.attended = userPayload[0]["attended"]
-            thing.save()
-        return Response(serializer.data)
+    def get_roster(self, event):
+        # Same output as self.serializer(event).data, built from .values()
+        # rows: large rosters would otherwise instantiate every mentor
+        compiled = compile_serializer(RegisterMentorSerializer)
+        responses = Register.objects.filter(event=event).order_by('pk')
+        return {'responses': compiled.serialize(compiled.values(responses))}
+
+    def get(self, request, pk, format=None):
+        return Response(self.get_roster(self.get_object(pk)))
+
+    def put(self, request, pk, format=None):
+        """
+        Takes {"responses": [{"mentor": <username>, "attended": <bool>}, ...]}.
+        Mentors left out keep their current attendance.
+        """
+        event = self.get_object(pk)
+        update = AttendanceUpdateSerializer(data=request.data)
+        if not update.is_valid():
+            return Response(update.errors, status=status.HTTP_400_BAD_REQUEST)
+        errors = update_attendance(event, update.validated_data['responses'])
+        if errors:
+            return Response({'responses': errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(self.get_roster(event))
@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import MentorProfile
+
+# Bounds staleness for processes that did not see the invalidation
+CACHE_TIMEOUT = getattr(settings, 'USER_COORDINATES_CACHE_TIMEOUT', 300)
+
+
+def cache_key(user_id):
+    return 'mentor-coordinates:%s' % user_id
+
+
+def get_user_coordinates(user):
+    """
+    Returns the (latitude, longitude) of a user's mentor profile as floats,
+    or None for anonymous users and accounts without a mentor profile.
+    """
+    if not user.is_authenticated:
+        return None
+    key = cache_key(user.pk)
+    coordinates = cache.get(key)
+    if coordinates is None:
+        row = MentorProfile.objects.filter(user=user).values_list(
+            'latitude', 'longitude').first()
+        # An empty tuple caches "no profile" too
+        coordinates = (float(row[0]), float(row[1])) if row else ()
+        cache.set(key, coordinates, CACHE_TIMEOUT)
+    return coordinates or None
+
+
+def clear_user_coordinates(user_id):
+    cache.delete(cache_key(user_id))
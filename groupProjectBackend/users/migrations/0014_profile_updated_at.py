@@ -0,0 +1,23 @@
+# Generated by Django 3.0.8 on 2026-10-18 12:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0013_auto_20201113_1145'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mentorprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='orgprofile',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,12 +1,56 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.db.models.signals import m2m_changed, post_save, pre_delete
 from django.dispatch import receiver
+from django.utils import timezone
 from events.models import Category
 
 
-class CustomUser(AbstractUser):
+class TrackedFieldsMixin:
+    """
+    Remembers the values of `tracked_fields` an instance was loaded or last
+    saved with, so post_save receivers can skip work when they did not
+    change (see has_changed()).
+    """
+    tracked_fields = ()
+
+    def _track(self, names=None):
+        loaded = getattr(self, '_loaded_values', {})
+        for name in self.tracked_fields if names is None else names:
+            # Deferred fields are not tracked
+            if name in self.__dict__:
+                loaded[name] = self.__dict__[name]
+        self._loaded_values = loaded
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._track()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._track()
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        self._track(None if update_fields is None else [
+            name for name in self.tracked_fields if name in update_fields])
+
+    def has_changed(self, name):
+        """
+        Whether field `name` differs from the value the instance was loaded
+        with. True when that value is unknown (e.g. a new instance).
+        """
+        loaded = getattr(self, '_loaded_values', {})
+        return name not in loaded or loaded[name] != getattr(self, name)
+
+
+class CustomUser(TrackedFieldsMixin, AbstractUser):
     is_org = models.BooleanField('is organisation', default=False)
+    # Event lists, search documents and caches show usernames
+    tracked_fields = ('username',)
 
     def __str__(self):
         return str(self.username)
@@ -28,12 +72,15 @@ class MentorProfile(models.Model):
         related_name='mentor_profile',
     )
     skills = models.ManyToManyField(Category, related_name='mentors')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.username
 
 
-class OrgProfile(models.Model):
+class OrgProfile(TrackedFieldsMixin, models.Model):
+    # Search documents show company names
+    tracked_fields = ('company_name',)
     company_name = models.CharField(max_length=300, blank=True, null=True)
     contact_name = models.CharField(max_length=300, blank=True, null=True)
     org_bio = models.CharField(max_length=5000, blank=True, null=True)
@@ -44,6 +91,7 @@ class OrgProfile(models.Model):
         null=True,
         related_name='org_profile',
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.user.username
@@ -58,6 +106,34 @@ def create_user_profile(sender, instance, created, **kwargs):
             MentorProfile.objects.create(user=instance)
 
 
+def touch_mentor_profiles(queryset):
+    MentorProfile.objects.filter(pk__in=list(queryset.values_list('pk', flat=True))).update(
+        updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=MentorProfile.skills.through)
+def touch_mentor_skills(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if not reverse:
+        touch_mentor_profiles(MentorProfile.objects.filter(pk=instance.pk))
+    elif pk_set:
+        touch_mentor_profiles(MentorProfile.objects.filter(pk__in=pk_set))
+    else:
+        touch_mentor_profiles(instance.mentors.all())
+
+
+@receiver(post_save, sender=Category)
+def touch_category_mentors(sender, instance, created, raw=False, **kwargs):
+    if not created and not raw:
+        touch_mentor_profiles(instance.mentors.all())
+
+
+@receiver(pre_delete, sender=Category)
+def touch_deleted_category_mentors(sender, instance, **kwargs):
+    touch_mentor_profiles(instance.mentors.all())
+
+
 # @receiver(post_save, sender=CustomUser)
 # def update_profile(sender, instance, created, **kwargs):
 #     if created == False:
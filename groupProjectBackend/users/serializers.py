@@ -2,7 +2,9 @@ from rest_framework import serializers
 # from allauth.account.util import setup_user_email
 # from rest_auth.registration.serializers import RegisterSerializer
 from .models import CustomUser, OrgProfile, MentorProfile
+from .coordinates import clear_user_coordinates
 from events.models import Category
+from events.serializers import CategorySlugField
 
 
 class CustomUserSerializer(serializers.ModelSerializer):
@@ -52,8 +54,7 @@ class MentorProfileSerializer(serializers.ModelSerializer):
         max_digits=15, decimal_places=10, default=-31.95351)
     longitude = serializers.DecimalField(
         max_digits=15, decimal_places=10, default=115.85705)
-    skills = serializers.SlugRelatedField(
-        many=True, slug_field="category", queryset=Category.objects.all())
+    skills = CategorySlugField(many=True)
 
     class Meta:
         model = MentorProfile
@@ -73,6 +74,7 @@ class MentorProfileSerializer(serializers.ModelSerializer):
             skills = instance.skills
             skills_updated = True
 
+        old_coordinates = (instance.latitude, instance.longitude)
         instance.name = validated_data.get('name', instance.name)
         instance.bio = validated_data.get('bio', instance.bio)
         instance.mentor_image = validated_data.get('mentor_image', instance.mentor_image)
@@ -88,6 +90,8 @@ class MentorProfileSerializer(serializers.ModelSerializer):
             skills.set(skills_data)
 
         instance.save()
+        if (instance.latitude, instance.longitude) != old_coordinates:
+            clear_user_coordinates(instance.user_id)
         return instance
 
 
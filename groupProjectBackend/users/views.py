@@ -8,6 +8,8 @@ from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied
 from .permissions import IsOwnerOrReadOnly, IsProfileUserOrReadOnly, IsNotAuthenticated
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from events.conditional import conditional_get
+from events.streaming import streaming_list_response
 
 
 class CustomUserCreate(generics.CreateAPIView):
@@ -55,10 +57,9 @@ class ChangePasswordView(generics.UpdateAPIView):
 class CustomUserList(APIView):
     permission_classes = [IsAdminUser, ]
 
-    def get(self, request):
+    def get(self, request, format=None):
         users = CustomUser.objects.all()
-        serializer = CustomUserSerializer(users, many=True)
-        return Response(serializer.data)
+        return streaming_list_response(request, users, CustomUserSerializer)
 
 
 class CustomUserDetail(APIView):
@@ -71,12 +72,12 @@ class CustomUserDetail(APIView):
         except CustomUser.DoesNotExist:
             raise Http404
 
-    def get(self, request, username):
+    def get(self, request, username, format=None):
         user = self.get_object(username)
         serializer = CustomUserSerializer(user)
         return Response(serializer.data)
 
-    def put(self, request, username):
+    def put(self, request, username, format=None):
         user = self.get_object(username)
         self.check_object_permissions(request, user)
         data = request.data
@@ -96,7 +97,7 @@ class CustomUserDetail(APIView):
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    def delete(self, request, username):
+    def delete(self, request, username, format=None):
         user = self.get_object(username)
         self.check_object_permissions(request, user)
 
@@ -119,12 +120,17 @@ class MentorProfileDetail(APIView):
         except MentorProfile.DoesNotExist:
             raise Http404
 
-    def get(self, request, username):
+    def get_version(self, request, username, format=None):
+        return MentorProfile.objects.filter(user__username=username).values_list(
+            'updated_at', flat=True).first()
+
+    @conditional_get
+    def get(self, request, username, format=None):
         profile = self.get_object(username)
         serializer = MentorProfileSerializer(profile)
         return Response(serializer.data)
 
-    def put(self, request, username):
+    def put(self, request, username, format=None):
         profile = self.get_object(username)
         self.check_object_permissions(request, profile)
         serializer = MentorProfileSerializer(
@@ -154,12 +160,17 @@ class OrgProfileDetail(APIView):
         except org_profile.DoesNotExist:
             raise Http404
 
-    def get(self, request, username):
+    def get_version(self, request, username, format=None):
+        return OrgProfile.objects.filter(user__username=username).values_list(
+            'updated_at', flat=True).first()
+
+    @conditional_get
+    def get(self, request, username, format=None):
         org_profile = self.get_object(username=username)
         serializer = OrgProfileSerializer(org_profile)
         return Response(serializer.data)
 
-    def put(self, request, username):
+    def put(self, request, username, format=None):
         org_profile = self.get_object(username=username)
         serializer = OrgProfileSerializer(
             org_profile, data=request.data, partial=True)